@@ -0,0 +1,185 @@
+# aggregates.py
+
+import copy
+import hashlib
+from datetime import datetime
+
+import pandas as pd
+
+from columns import DATE_COLUMNS
+from cost_attribution import CostAttribution, cost_fingerprint
+from time_series import TimeSeriesCube
+
+# Kolom ringkasan produk sebelum biaya ditambahkan (keluaran groupby process_data)
+SUMMARY_BASE_COLUMNS = ['Seller SKU', 'Product Name', 'Variation', 'TotalQty', 'Revenue']
+
+
+class DatasetAggregates:
+    """Agregat yang dihitung sekali per dataset terproses.
+
+    Dasbor, detail data, ringkasan AI dan laporan Excel membaca total
+    tingkat pesanan, ringkasan per produk/SKU dan deret waktu dari
+    sini, sehingga data gabungan tidak perlu di-dedupe ulang setiap rerun.
+    Bagian yang tidak bergantung pada biaya dihitung di ``__init__``;
+    ``with_costs`` menambahkan kolom biaya tanpa mengulang agregasi.
+    """
+
+    def __init__(self, merged_data, fingerprint=None):
+        # Sidik jari dataset terproses; digabung dengan hash biaya oleh with_costs
+        if fingerprint is None:
+            fingerprint = str(int(pd.util.hash_pandas_object(merged_data, index=False).sum()))
+        self.fingerprint = fingerprint
+        # Sidik jari tanpa biaya, dan sidik jari tabel biaya yang dipakai with_costs
+        self.base_fingerprint = fingerprint
+        self.cost_key = None
+        # Total tingkat pesanan (pesanan unik)
+        unique_orders = merged_data.drop_duplicates(subset=['Order ID'])
+        self.total_orders = unique_orders['Order ID'].nunique()
+        self.total_revenue = unique_orders['Total settlement amount'].sum()
+        self.total_qty = merged_data['Quantity'].sum()
+
+        # Ringkasan berdasarkan SKU (tanpa biaya)
+        self._sku_base = (
+            merged_data.groupby('Seller SKU', as_index=False, observed=True)
+            .agg({
+                'Quantity': 'sum',
+                'Order ID': 'nunique',
+                'Total settlement amount': 'sum'
+            })
+            .rename(columns={
+                'Quantity': 'Total Quantity',
+                'Order ID': 'Total Orders',
+                'Total settlement amount': 'Total Revenue'
+            })
+        )
+        # Nama produk pertama untuk setiap SKU, dipakai untuk mencari biaya
+        self._sku_products = merged_data.groupby('Seller SKU', observed=True)['Product Name'].first()
+
+        self.date_column = next((col for col in DATE_COLUMNS if col in merged_data.columns), None)
+        # Rollup hari x SKU x produk (TimeSeriesCube), None jika tanggal tidak tersedia
+        self.has_daily_sales = False
+        self.time_series = None
+        self.daily_sales, self.date_range = self._daily_sales(merged_data)
+
+        self.summary = None
+        self.summary_by_sku = None
+        self.total_cost = 0
+        self.sku_total_cost = 0
+
+    def _daily_sales(self, merged_data):
+        """Membangun cube deret waktu lalu penjualan harian dan rentang tanggal darinya"""
+        now = datetime.now()
+        if not self.date_column:
+            daily_sales = pd.DataFrame({
+                'Order Date': ['Kolom tanggal tidak ditemukan'],
+                'Daily Quantity': [0],
+                'Daily Orders': [0],
+                'Daily Revenue': [0]
+            })
+            return daily_sales, (now, now)
+
+        try:
+            self.time_series = TimeSeriesCube.from_merged(merged_data, self.date_column)
+            if self.time_series.empty:
+                raise ValueError("tidak ada tanggal yang valid")
+            self.has_daily_sales = True
+            return self._daily_sales_from_cube(), self.time_series.date_range
+        except Exception:
+            self.time_series = None
+            daily_sales = pd.DataFrame({
+                'Order Date': ['Data tidak tersedia'],
+                'Daily Quantity': [0],
+                'Daily Orders': [0],
+                'Daily Revenue': [0]
+            })
+            return daily_sales, (now, now)
+
+    def _daily_sales_from_cube(self):
+        daily_sales = self.time_series.rollup('day').rename(columns={
+            'Period': 'Order Date',
+            'Quantity': 'Daily Quantity',
+            'Orders': 'Daily Orders',
+            'Revenue': 'Daily Revenue'
+        })
+        daily_sales['Order Date'] = daily_sales['Order Date'].dt.date
+        return daily_sales
+
+    @classmethod
+    def combine(cls, parts, fingerprint):
+        """Menggabungkan agregat dari partisi dengan pesanan yang saling lepas.
+
+        Semua total dan jumlah pesanan unik bisa dijumlahkan karena setiap
+        pesanan hanya berada di satu partisi.
+        """
+        result = copy.copy(parts[0])
+        result.fingerprint = fingerprint
+        result.base_fingerprint = fingerprint
+        result.cost_key = None
+        result.total_orders = sum(part.total_orders for part in parts)
+        result.total_revenue = sum(part.total_revenue for part in parts)
+        result.total_qty = sum(part.total_qty for part in parts)
+
+        result._sku_base = (
+            pd.concat([part._sku_base for part in parts], ignore_index=True)
+            .groupby('Seller SKU', as_index=False, observed=True)
+            .sum()
+        )
+        result._sku_products = (
+            pd.concat([part._sku_products for part in parts])
+            .groupby(level=0, observed=True)
+            .first()
+        )
+
+        dated = [part for part in parts if part.has_daily_sales]
+        if dated:
+            result.has_daily_sales = True
+            result.date_column = dated[0].date_column
+            result.time_series = TimeSeriesCube.combine([part.time_series for part in dated])
+            result.daily_sales = result._daily_sales_from_cube()
+            result.date_range = result.time_series.date_range
+        return result
+
+    def with_costs(self, summary, cost_data):
+        """Salinan agregat dengan ringkasan produk dan SKU yang sudah berbiaya"""
+        result = copy.copy(self)
+        result.cost_key = cost_fingerprint(cost_data)
+        result.fingerprint = hashlib.sha256(
+            f"{self.base_fingerprint}|{result.cost_key}".encode('utf-8')
+        ).hexdigest()
+        result.summary = summary
+        result.total_cost = summary['Total Cost'].sum()
+
+        summary_by_sku = self._sku_base.copy()
+        CostAttribution(cost_data).apply(
+            summary_by_sku, 'Total Quantity', 'Total Revenue',
+            product_names=summary_by_sku['Seller SKU'].map(self._sku_products)
+        )
+        result.summary_by_sku = summary_by_sku
+        result.sku_total_cost = summary_by_sku['Total Cost'].sum()
+        return result
+
+    def for_costs(self, cost_data):
+        """Agregat berbiaya untuk ``cost_data``.
+
+        Jika tabel biaya sudah berubah sejak ``with_costs``, ringkasan
+        produk dihitung ulang dari kolom tanpa biaya; jika sama, dikembalikan
+        apa adanya.
+        """
+        if self.cost_key == cost_fingerprint(cost_data):
+            return self
+        summary = self.summary[SUMMARY_BASE_COLUMNS].copy()
+        CostAttribution(cost_data).apply(summary, 'TotalQty', 'Revenue')
+        return self.with_costs(summary, cost_data)
+
+    # Metrik turunan berdasarkan ringkasan per produk (metode Dasbor Kinerja)
+    @property
+    def total_profit(self):
+        return self.total_revenue - self.total_cost
+
+    @property
+    def avg_order_value(self):
+        return self.total_revenue / self.total_orders if self.total_orders > 0 else 0
+
+    @property
+    def profit_margin(self):
+        return (self.total_profit / self.total_revenue * 100) if self.total_revenue > 0 else 0
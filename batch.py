@@ -0,0 +1,158 @@
+# batch.py
+"""Pemrosesan batch tanpa Streamlit untuk banyak toko sekaligus.
+
+Setiap direktori toko berisi subdirektori ``pesanan/`` dan ``income/``
+dengan satu atau lebih file ekspor Excel TikTok Shop. Semua file per jenis
+digabung, diproses dengan ``DataManager.process_data`` lalu ditulis
+sebagai laporan Excel ``<output>/<nama toko>.xlsx``. Toko diproses
+paralel dalam process pool. Contoh::
+
+    python batch.py toko/* --costs biaya.csv --output laporan/ --workers 4
+
+Tabel biaya dibaca dengan backend lokal dari ``cost_store`` sesuai
+ekstensi file: CSV dengan kolom ``product_name`` dan ``cost_per_unit``,
+JSON berisi objek nama produk -> biaya, atau SQLite.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from cost_store import file_cost_store
+from data_manager import DataManager
+from ingestion import read_upload
+from report_generator import ReportGenerator
+from settlement_index import SettlementIndexStore
+
+EXPORT_EXTENSIONS = ('.xlsx', '.xls')
+EXPORT_KINDS = ('pesanan', 'income')
+
+
+def export_files(shop_dir, kind):
+    """File ekspor ``kind`` milik satu toko, urut berdasarkan nama"""
+    directory = os.path.join(shop_dir, kind)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(EXPORT_EXTENSIONS) and not name.startswith('~$')
+    )
+
+
+def read_exports(shop_dir, kind):
+    """Menggabungkan semua file ekspor ``kind`` satu toko menjadi satu DataFrame"""
+    paths = export_files(shop_dir, kind)
+    if not paths:
+        raise FileNotFoundError(f"Tidak ada file ekspor di {os.path.join(shop_dir, kind)}")
+    frames = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            frames.append(read_upload(f.read(), kind))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def new_result(shop_dir):
+    shop = os.path.basename(os.path.normpath(shop_dir))
+    return {'shop': shop, 'report': None, 'orders': 0, 'products': 0, 'unmatched_orders': 0, 'error': None}
+
+
+def process_shop(shop_dir, cost_data, output_dir):
+    """Memproses satu toko dan menulis laporannya; dijalankan di proses worker"""
+    shop = os.path.basename(os.path.normpath(shop_dir))
+    result = new_result(shop_dir)
+    start = time.perf_counter()
+    try:
+        pesanan_data = read_exports(shop_dir, 'pesanan')
+        income_data = read_exports(shop_dir, 'income')
+
+        # Indeks settlement sementara agar worker tidak berbagi direktori indeks
+        with tempfile.TemporaryDirectory() as index_dir:
+            data_manager = DataManager(settlement_store=SettlementIndexStore(index_dir))
+            merged_data, summary_data = data_manager.process_data(pesanan_data, income_data, cost_data)
+
+        if merged_data is None:
+            result['error'] = "Tidak ditemukan data yang cocok"
+        else:
+            report = ReportGenerator().create_excel_report(
+                merged_data, summary_data, cost_data, aggregates=data_manager.aggregates
+            )
+            path = os.path.join(output_dir, f"{shop}.xlsx")
+            with open(path, 'wb') as f:
+                shutil.copyfileobj(report, f)
+            result.update(
+                report=path,
+                orders=int(merged_data['Order ID'].nunique()),
+                products=len(summary_data),
+                unmatched_orders=len(data_manager.unmatched_orders),
+            )
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def run(shop_dirs, cost_data, output_dir, workers=None):
+    """Memproses semua toko dalam process pool; hasil dikembalikan sesuai urutan selesai"""
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_shop, shop_dir, cost_data, output_dir) for shop_dir in shop_dirs]
+        for future in as_completed(futures):
+            result = future.result()
+            print_result(result)
+            results.append(result)
+    return results
+
+
+def print_result(result):
+    if result['error']:
+        print(f"❌ {result['shop']}: {result['error']} ({result['seconds']:.1f} dtk)", flush=True)
+    else:
+        print(
+            f"✅ {result['shop']}: {result['orders']:,} pesanan, {result['products']:,} produk, "
+            f"{result['unmatched_orders']:,} tanpa settlement -> {result['report']} ({result['seconds']:.1f} dtk)",
+            flush=True
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Membuat laporan Excel untuk banyak toko TikTok Shop tanpa Streamlit")
+    parser.add_argument('shops', nargs='+', help="direktori toko berisi subdirektori pesanan/ dan income/")
+    parser.add_argument('--costs', required=True, help="tabel biaya (.csv, .json atau .sqlite)")
+    parser.add_argument('--output', default='laporan', help="direktori tujuan laporan")
+    parser.add_argument('--workers', type=int, help="jumlah proses paralel (bawaan: jumlah CPU)")
+    parser.add_argument('--json', help="tulis ringkasan hasil ke file JSON ini")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.costs):
+        parser.error(f"file biaya tidak ditemukan: {args.costs}")
+    # Path yang salah ketik dilaporkan sebagai toko gagal, bukan dilewati diam-diam
+    results = []
+    for path in args.shops:
+        if not os.path.isdir(path):
+            result = dict(new_result(path), error=f"Direktori toko tidak ditemukan: {path}", seconds=0.0)
+            print_result(result)
+            results.append(result)
+    shop_dirs = [path for path in args.shops if os.path.isdir(path)]
+    cost_data = file_cost_store(args.costs).load_cost_data()
+    results += run(shop_dirs, cost_data, args.output, workers=args.workers)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(sorted(results, key=lambda r: r['shop']), f, ensure_ascii=False, indent=2)
+
+    failed = sum(1 for result in results if result['error'])
+    print(f"\n{len(results) - failed}/{len(results)} toko berhasil diproses")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
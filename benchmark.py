@@ -0,0 +1,162 @@
+# benchmark.py
+"""Benchmark pipeline dengan data sintetis.
+
+Mengukur waktu dan memori puncak (tracemalloc) per tahap: parsing
+unggahan Excel, setiap tahap ``DataManager.process_data`` dan pembuatan
+laporan. Kolom teks pandas disimpan di buffer Arrow yang tidak terlihat
+oleh tracemalloc, jadi pertambahan memori Arrow dicatat terpisah
+(``arrow_mb``). Contoh::
+
+    python benchmark.py --rows 10000 100000 1000000 --json hasil.jsonl
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pyarrow as pa
+
+from data_manager import DataManager
+from ingestion import read_upload
+from report_generator import ReportGenerator
+from settlement_index import SettlementIndexStore
+from synthetic_data import generate_exports, generate_cost_data, to_excel_bytes
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+# Menulis dan membaca Excel jauh lebih lambat dari tahap lain; di atas batas ini dilewati
+DEFAULT_EXCEL_MAX_ROWS = 100_000
+
+
+class StageRecorder:
+    """Mencatat durasi, memori puncak (di atas memori awal) dan pertambahan memori Arrow setiap tahap"""
+
+    def __init__(self, rows, trace_memory=True):
+        self.rows = rows
+        self.trace_memory = trace_memory
+        self.results = []
+        self._stage = None
+
+    def start(self, stage):
+        """Menutup tahap berjalan (jika ada) lalu memulai ``stage``"""
+        self.finish()
+        self._stage = stage
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self._start_memory = tracemalloc.get_traced_memory()[0]
+        self._start_arrow = pa.total_allocated_bytes()
+        self._start_time = time.perf_counter()
+
+    def finish(self):
+        if self._stage is None:
+            return
+        elapsed = time.perf_counter() - self._start_time
+        peak = None
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] - self._start_memory
+        self.results.append({
+            'rows': self.rows,
+            'stage': self._stage,
+            'seconds': round(elapsed, 4),
+            'peak_mb': round(peak / 1024 ** 2, 2) if peak is not None else None,
+            'arrow_mb': round((pa.total_allocated_bytes() - self._start_arrow) / 1024 ** 2, 2),
+        })
+        self._stage = None
+
+    @contextmanager
+    def measure(self, stage):
+        self.start(stage)
+        try:
+            yield
+        finally:
+            self.finish()
+
+    def progress(self, prefix):
+        """Callback ``progress`` untuk process_data: setiap tahap dicatat terpisah"""
+        return lambda stage: self.start(f"{prefix}.{stage}")
+
+
+def run(rows, skus, adjustment_rate, excel_max_rows, trace_memory=True, pesanan_dates=False):
+    """Menjalankan satu putaran benchmark dan mengembalikan hasil per tahap"""
+    pesanan, income = generate_exports(
+        rows=rows, skus=skus, adjustment_rate=adjustment_rate, pesanan_dates=pesanan_dates
+    )
+    cost_data = generate_cost_data(pesanan)
+    recorder = StageRecorder(rows, trace_memory)
+
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        if rows <= excel_max_rows:
+            pesanan_bytes = to_excel_bytes(pesanan, 'pesanan')
+            income_bytes = to_excel_bytes(income, 'income')
+            with recorder.measure('parse.pesanan'):
+                pesanan = read_upload(pesanan_bytes, 'pesanan')
+            with recorder.measure('parse.income'):
+                income = read_upload(income_bytes, 'income')
+            del pesanan_bytes, income_bytes
+
+        # Indeks settlement di direktori sementara agar tidak terbaca dari putaran sebelumnya
+        with tempfile.TemporaryDirectory() as index_dir:
+            data_manager = DataManager(settlement_store=SettlementIndexStore(index_dir))
+            merged, summary = data_manager.process_data(
+                pesanan, income, cost_data, progress=recorder.progress('process_data')
+            )
+            recorder.finish()
+
+            with recorder.measure('process_data.cost_only'):
+                data_manager.process_data(pesanan, income, dict(cost_data, **{'Produk Baru': 1.0}))
+
+        aggregates = data_manager.aggregates
+        report_generator = ReportGenerator()
+        with recorder.measure('report.xlsx'):
+            report_generator.create_excel_report(merged, summary, cost_data, aggregates=aggregates)
+        with recorder.measure('report.csv_zip'):
+            report_generator.create_csv_zip(merged, summary, cost_data, aggregates=aggregates)
+        with recorder.measure('report.json'):
+            report_generator.create_json_summary(merged, summary, cost_data, aggregates=aggregates)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return recorder.results
+
+
+def print_results(results):
+    print(f"{'rows':>10}  {'stage':<28}{'seconds':>10}{'peak MB':>10}{'arrow MB':>10}")
+    for result in results:
+        peak = f"{result['peak_mb']:.1f}" if result['peak_mb'] is not None else '-'
+        print(f"{result['rows']:>10,}  {result['stage']:<28}{result['seconds']:>10.3f}{peak:>10}{result['arrow_mb']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline dengan ekspor TikTok Shop sintetis")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="jumlah baris pesanan per putaran")
+    parser.add_argument('--skus', type=int, default=2_000, help="jumlah Seller SKU berbeda")
+    parser.add_argument('--adjustment-rate', type=float, default=0.05, help="proporsi pesanan dengan baris penyesuaian")
+    parser.add_argument('--excel-max-rows', type=int, default=DEFAULT_EXCEL_MAX_ROWS,
+                        help="lewati parsing Excel untuk putaran di atas jumlah baris ini")
+    parser.add_argument('--pesanan-dates', action='store_true',
+                        help="sertakan kolom tanggal di ekspor pesanan (bawaan: hanya di pendapatan, seperti ekspor asli)")
+    parser.add_argument('--no-memory', action='store_true', help="tanpa tracemalloc (waktu lebih akurat)")
+    parser.add_argument('--json', help="tambahkan hasil ke file JSON-lines ini")
+    args = parser.parse_args()
+
+    all_results = []
+    for rows in args.rows:
+        results = run(rows, args.skus, args.adjustment_rate, args.excel_max_rows,
+                      trace_memory=not args.no_memory, pesanan_dates=args.pesanan_dates)
+        print_results(results)
+        print()
+        all_results.extend(results)
+
+    if args.json:
+        with open(args.json, 'a', encoding='utf-8') as f:
+            for result in all_results:
+                f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
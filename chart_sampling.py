@@ -0,0 +1,58 @@
+# chart_sampling.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Di atas jumlah titik ini grafik scatter dirender sebagai kepadatan + titik penting
+SCATTER_POINT_LIMIT = int(os.environ.get('TIKTOKDATA_SCATTER_POINT_LIMIT', 2000))
+# Produk teratas yang selalu tampil sebagai titik berlabel
+LABELED_TOP_N = 15
+# Jumlah bin per sumbu untuk peta kepadatan
+DENSITY_BINS = 60
+# Batas pencilan: di luar Q1 - k*IQR .. Q3 + k*IQR pada salah satu sumbu
+OUTLIER_IQR_FACTOR = 3.0
+
+
+def _robust_distance(values):
+    """Jarak dari median dalam satuan IQR"""
+    q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    if not iqr:
+        iqr = values.abs().max() or 1.0
+    return (values - median).abs() / iqr
+
+
+def highlight_points(df, x, y, rank_by, limit=SCATTER_POINT_LIMIT, top_n=LABELED_TOP_N):
+    """Memilih titik yang tetap ditampilkan satu per satu.
+
+    Mengembalikan ``(top_mask, outlier_mask)``: ``top_n`` baris teratas
+    menurut ``rank_by`` dan pencilan pada sumbu ``x`` atau ``y``. Jika
+    pencilan melebihi sisa ``limit``, hanya yang paling ekstrem dipakai.
+    """
+    top_mask = pd.Series(False, index=df.index)
+    top_mask[df.nlargest(top_n, rank_by).index] = True
+
+    distance = np.maximum(_robust_distance(df[x]), _robust_distance(df[y]))
+    # Jarak dari median > 0.5 + k (dalam IQR) kira-kira setara aturan Q1/Q3 +- k*IQR
+    candidates = distance[(distance > OUTLIER_IQR_FACTOR + 0.5) & ~top_mask]
+    candidates = candidates.nlargest(max(limit - int(top_mask.sum()), 0))
+    outlier_mask = df.index.isin(candidates.index)
+    return top_mask.to_numpy(), outlier_mask
+
+
+def binned_density(df, x, y, bins=DENSITY_BINS):
+    """Histogram 2D di sisi server: pusat bin x, pusat bin y dan jumlah titik per sel.
+
+    Sel kosong bernilai NaN agar tidak digambar; matriks jumlah sudah
+    ditranspos ke orientasi ``z[y][x]`` yang dipakai Plotly Heatmap.
+    """
+    x_values = df[x].to_numpy(float)
+    y_values = df[y].to_numpy(float)
+    finite = np.isfinite(x_values) & np.isfinite(y_values)
+    counts, x_edges, y_edges = np.histogram2d(x_values[finite], y_values[finite], bins=bins)
+    counts = np.where(counts > 0, counts, np.nan).T
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    return x_centers, y_centers, counts
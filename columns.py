@@ -0,0 +1,10 @@
+# columns.py
+
+# Kolom yang benar-benar dipakai oleh process_data dan ReportGenerator
+DATE_COLUMNS = [
+    'Order created time(UTC)', 'Order creation time', 'Order Creation Time',
+    'Creation Time', 'Date', 'Order Date', 'Order created time', 'Created time'
+]
+PESANAN_COLUMNS = ['Order ID', 'Order Status', 'Seller SKU', 'Product Name', 'Variation', 'Quantity']
+INCOME_COLUMNS = ['Order/adjustment ID', 'Total settlement amount']
+NUMERIC_COLUMNS = ['Quantity', 'Total settlement amount']
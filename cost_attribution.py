@@ -0,0 +1,58 @@
+# cost_attribution.py
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def cost_fingerprint(cost_data):
+    """Hash tabel biaya, tidak bergantung pada urutan entri"""
+    items = sorted((str(name), float(cost)) for name, cost in cost_data.items())
+    return hashlib.sha256(json.dumps(items).encode('utf-8')).hexdigest()
+
+
+class CostAttribution:
+    """Atribusi biaya produk ke tabel ringkasan secara tervektorisasi.
+
+    Tabel biaya dibangun sekali sebagai Series berindeks nama produk, lalu
+    dicocokkan ke kolom nama produk dengan lookup hash (atau lewat kategori
+    jika kolomnya bertipe categorical), tanpa lambda per baris.
+    """
+
+    def __init__(self, cost_data):
+        self.cost_table = pd.Series(cost_data, dtype='float64')
+
+    def lookup(self, product_names):
+        """Biaya per unit untuk setiap nama produk, NaN jika tidak ada di tabel biaya"""
+        if isinstance(product_names.dtype, pd.CategoricalDtype):
+            # Cukup cocokkan kategori unik lalu sebarkan lewat kode
+            per_category = pd.Series(product_names.cat.categories).map(self.cost_table).to_numpy()
+            codes = product_names.cat.codes.to_numpy()
+            values = np.where(codes >= 0, per_category[codes], np.nan)
+            return pd.Series(values, index=product_names.index, dtype='float64')
+        return product_names.map(self.cost_table).astype('float64')
+
+    def missing_products(self, product_names):
+        """Daftar nama produk yang belum memiliki entri biaya"""
+        costs = self.lookup(product_names)
+        return sorted(product_names[costs.isna()].dropna().astype(str).unique())
+
+    def apply(self, frame, quantity_col, revenue_col, product_names=None):
+        """Menambahkan kolom biaya, profit, margin dan bagi hasil ke ``frame``.
+
+        Mengembalikan daftar produk tanpa biaya (dihitung dengan biaya 0).
+        """
+        if product_names is None:
+            product_names = frame['Product Name']
+        costs = self.lookup(product_names)
+
+        frame['Cost per Unit'] = costs.fillna(0.0).to_numpy()
+        frame['Total Cost'] = frame[quantity_col] * frame['Cost per Unit']
+        frame['Profit'] = frame[revenue_col] - frame['Total Cost']
+        frame['Profit Margin %'] = (frame['Profit'] / frame[revenue_col] * 100).round(2)
+        frame['Share 60%'] = frame['Profit'] * 0.6
+        frame['Share 40%'] = frame['Profit'] * 0.4
+
+        return sorted(product_names[costs.isna()].dropna().astype(str).unique())
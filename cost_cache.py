@@ -0,0 +1,222 @@
+# cost_cache.py
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from cost_store import CostStore
+
+
+class CostCache(CostStore):
+    """Cache biaya lokal (SQLite) di depan sumber biaya jarak jauh.
+
+    Pembacaan dilayani langsung dari SQLite; jika data lebih tua dari
+    ``ttl_seconds`` sumber jarak jauh divalidasi ulang di thread latar.
+    Penulisan langsung masuk ke SQLite (write-through) lalu dikirim ke
+    sumber jarak jauh oleh thread yang sama. ``remote_factory`` membuat
+    objek dengan ``load_cost_data``/``save_cost_data`` (mis. CostManager)
+    dan baru dipanggil saat sinkronisasi pertama.
+    """
+
+    def __init__(self, remote_factory, path=None, ttl_seconds=300):
+        self.remote_factory = remote_factory
+        self.path = path or os.path.join(
+            os.environ.get('TIKTOKDATA_STORE_DIR', '.data_store'), 'cost_cache.sqlite'
+        )
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+        self._remote = None
+        # _db_lock menjaga tulisan lokal, _sync_lock menjaga panggilan ke sumber jarak jauh
+        self._db_lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._revalidate_requested = False
+        self._syncing = False
+        self.last_error = None
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS costs ("
+                "product_name TEXT PRIMARY KEY, cost_per_unit REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        self._worker = threading.Thread(target=self._run, name='cost-cache-sync', daemon=True)
+        self._worker.start()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get_remote(self):
+        if self._remote is None:
+            self._remote = self.remote_factory()
+        return self._remote
+
+    # --- meta ---
+    def _get_meta(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # --- API publik, sama dengan CostManager ---
+    def load_cost_data(self, wait=True):
+        """Mengembalikan biaya dari cache lokal, validasi ulang di latar jika kedaluwarsa.
+
+        Dengan ``wait=False`` cache yang belum pernah sinkron tidak menunggu
+        sumber jarak jauh: sinkronisasi dijadwalkan di latar dan None
+        dikembalikan.
+        """
+        last_synced = self.last_synced()
+        if last_synced is None:
+            if not wait:
+                self.request_revalidation()
+                return None
+            # Belum pernah sinkron: satu-satunya saat pembacaan harus menunggu sumber jarak jauh
+            with self._sync_lock:
+                if self.last_synced() is None:
+                    self._pull()
+        elif self.is_stale():
+            self.request_revalidation()
+        return self._read_local()
+
+    def get_cost(self, product_name, default=0.0):
+        """Biaya satu produk langsung dari primary key SQLite"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cost_per_unit FROM costs WHERE product_name = ?", (product_name,)
+            ).fetchone()
+        return float(row[0]) if row else default
+
+    def save_cost_data(self, cost_dict):
+        """Menulis perubahan ke SQLite lalu menjadwalkan sinkronisasi ke sumber jarak jauh"""
+        with self._db_lock:
+            current = self._read_local()
+            upserts = [
+                (name, float(value)) for name, value in cost_dict.items()
+                if current.get(name) != float(value)
+            ]
+            deletes = [(name,) for name in current if name not in cost_dict]
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO costs (product_name, cost_per_unit) VALUES (?, ?)", upserts
+                )
+                conn.executemany("DELETE FROM costs WHERE product_name = ?", deletes)
+                if upserts or deletes:
+                    self._set_meta(conn, 'dirty', 1)
+        self._wake.set()
+
+    def set_cost(self, product_name, cost):
+        """Menulis satu produk saja, sehingga biaya hasil sinkronisasi lain tidak tertimpa"""
+        with self._db_lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO costs (product_name, cost_per_unit) VALUES (?, ?)",
+                (product_name, float(cost))
+            )
+            self._set_meta(conn, 'dirty', 1)
+        self._wake.set()
+
+    def delete_cost(self, product_name):
+        """Menghapus satu produk saja dari cache lokal"""
+        with self._db_lock, self._connect() as conn:
+            deleted = conn.execute("DELETE FROM costs WHERE product_name = ?", (product_name,)).rowcount
+            if deleted:
+                self._set_meta(conn, 'dirty', 1)
+        self._wake.set()
+
+    def request_revalidation(self):
+        """Meminta thread latar membaca ulang sumber jarak jauh"""
+        self._revalidate_requested = True
+        self._wake.set()
+
+    def is_stale(self):
+        last_synced = self.last_synced()
+        return last_synced is None or time.time() - last_synced > self.ttl_seconds
+
+    def last_synced(self):
+        with self._connect() as conn:
+            value = self._get_meta(conn, 'last_synced')
+        return float(value) if value is not None else None
+
+    def status(self):
+        """Ringkasan status untuk indikator di UI"""
+        with self._connect() as conn:
+            dirty = self._get_meta(conn, 'dirty') == '1'
+        return {
+            'last_synced': self.last_synced(),
+            'stale': self.is_stale(),
+            'pending_writes': dirty,
+            'syncing': self._syncing,
+            'last_error': self.last_error,
+        }
+
+    # --- internal ---
+    def _read_local(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT product_name, cost_per_unit FROM costs").fetchall()
+        return {name: float(cost) for name, cost in rows}
+
+    def _pull(self):
+        """Mengganti isi cache lokal dengan data dari sumber jarak jauh"""
+        remote_costs = self._get_remote().load_cost_data()
+        with self._db_lock, self._connect() as conn:
+            if self._get_meta(conn, 'dirty') == '1':
+                # Ada penulisan lokal baru selama membaca; kirim dulu pada putaran berikutnya
+                self._revalidate_requested = True
+                self._wake.set()
+                return
+            conn.execute("DELETE FROM costs")
+            conn.executemany(
+                "INSERT INTO costs (product_name, cost_per_unit) VALUES (?, ?)",
+                [(name, float(cost)) for name, cost in remote_costs.items()]
+            )
+            self._set_meta(conn, 'last_synced', time.time())
+
+    def _push(self):
+        """Mengirim isi cache lokal ke sumber jarak jauh"""
+        with self._db_lock:
+            snapshot = self._read_local()
+            with self._connect() as conn:
+                self._set_meta(conn, 'dirty', 0)
+        try:
+            self._get_remote().save_cost_data(snapshot)
+        except Exception:
+            with self._db_lock, self._connect() as conn:
+                self._set_meta(conn, 'dirty', 1)
+            raise
+        with self._connect() as conn:
+            self._set_meta(conn, 'last_synced', time.time())
+
+    def sync(self):
+        """Satu putaran sinkronisasi: kirim penulisan tertunda lalu validasi ulang"""
+        with self._sync_lock:
+            self._syncing = True
+            try:
+                with self._connect() as conn:
+                    dirty = self._get_meta(conn, 'dirty') == '1'
+                if dirty:
+                    self._push()
+                if self._revalidate_requested:
+                    self._revalidate_requested = False
+                    self._pull()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            finally:
+                self._syncing = False
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=self.ttl_seconds)
+            self._wake.clear()
+            self.sync()
@@ -1,28 +1,232 @@
 # cost_manager.py
 
-import streamlit as st
+import re
+import threading
+
 import gspread
+from google.auth.exceptions import RefreshError
 from google.oauth2.service_account import Credentials
 import json
 
+from instrumentation import row_count, span
+
 class CostManager:
     SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
     SHEET_ID = "1Kuy05JjpsZPoYZI0DcdaY7G_2_i63tdJOKTy-PWH26M"  # dari URL Google Sheet
     SHEET_NAME = "Sheet1"
+    HEADER = ["product_name", "cost_per_unit"]
+
+    def __init__(self, worksheet=None, service_account_info=None):
+        # worksheet bisa diisi LocalWorksheet untuk pengujian tanpa Google Sheets
+        self.worksheet = worksheet
+        self._injected = worksheet is not None
+        self._lock = threading.RLock()
+        if not self._injected:
+            if service_account_info is None:
+                # Diimpor di sini agar modul ini bisa dipakai tanpa Streamlit (batch.py)
+                import streamlit as st
+                service_account_info = st.secrets["google_credentials"]
+            self.service_account_info = service_account_info
+            self._connect()
+
+        # Indeks produk -> nomor baris dan nilai terakhir yang diketahui ada di sheet
+        self._row_index = None
+        self._snapshot = {}
+        self._has_header = False
 
-    def __init__(self):
-        self.service_account_info = st.secrets["google_credentials"]
+    def _connect(self):
+        """Otorisasi ulang klien gspread dan buka worksheet sekali"""
         self.creds = Credentials.from_service_account_info(self.service_account_info, scopes=self.SCOPES)
         self.gc = gspread.authorize(self.creds)
+        self.worksheet = self.gc.open_by_key(self.SHEET_ID).worksheet(self.SHEET_NAME)
+
+    def _get_sheet(self):
+        return self.worksheet
+
+    def _call(self, action, name, rows_in=None):
+        """Menjalankan aksi pada worksheet, sambung ulang sekali jika otorisasi kedaluwarsa"""
+        with self._lock, span(f'cost_manager.{name}', rows_in=rows_in) as stage:
+            result = self._call_with_reconnect(action, stage)
+            stage.rows_out = row_count(result)
+            return result
+
+    def _call_with_reconnect(self, action, stage):
+        try:
+            return action(self._get_sheet())
+        except (RefreshError, gspread.exceptions.APIError) as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if self._injected or (isinstance(e, gspread.exceptions.APIError) and status not in (401, 403)):
+                raise
+            stage.attrs['reconnected'] = True
+            self._connect()
+            return action(self._get_sheet())
+
+    def _read_sheet(self, sheet):
+        """Membaca isi sheet sekaligus membangun indeks baris"""
+        values = sheet.get_all_values(value_render_option="UNFORMATTED_VALUE")
+        header = [str(h).strip() for h in values[0]] if values else []
+        name_col = header.index("product_name") if "product_name" in header else 0
+        cost_col = header.index("cost_per_unit") if "cost_per_unit" in header else 1
+
+        costs = {}
+        row_index = {}
+        for row_number, row in enumerate(values[1:], start=2):
+            name = str(row[name_col]) if name_col < len(row) else ""
+            if not name:
+                continue
+            cost = row[cost_col] if cost_col < len(row) else ""
+            costs[name] = float(cost) if cost != "" else 0.0
+            row_index[name] = row_number
+
+        self._has_header = bool(values)
+        self._row_index = row_index
+        self._snapshot = dict(costs)
+        return costs
 
     def load_cost_data(self):
-        sheet = self.gc.open_by_key(self.SHEET_ID).worksheet(self.SHEET_NAME)
-        records = sheet.get_all_records()
-        return {row["product_name"]: float(row["cost_per_unit"]) for row in records}
+        return self._call(self._read_sheet, 'load')
 
     def save_cost_data(self, cost_dict):
-        sheet = self.gc.open_by_key(self.SHEET_ID).worksheet(self.SHEET_NAME)
-        sheet.clear()
-        sheet.update(values=[["product_name", "cost_per_unit"]], range_name="A1")
-        rows = [[k, v] for k, v in cost_dict.items()]
-        sheet.update(values=rows, range_name="A2")
\ No newline at end of file
+        """Menyimpan hanya baris yang berubah dalam satu batch update.
+
+        Kolom nama dibaca ulang sebelum diff; jika sheet sudah diubah di
+        luar aplikasi (baris diurutkan atau dihapus), seluruh sheet ditulis
+        ulang agar biaya tidak tertulis di baris produk lain.
+        """
+        self._call(lambda sheet: self._save(sheet, cost_dict), 'save', rows_in=len(cost_dict))
+
+    def _save(self, sheet, cost_dict):
+        if self._row_index is not None and not self._index_matches(sheet):
+            self._rewrite(sheet, cost_dict)
+            return
+        if self._row_index is None:
+            self._read_sheet(sheet)
+
+        updates = self._diff_updates(cost_dict)
+        if not self._has_header:
+            updates.insert(0, {"range": "A1:B1", "values": [self.HEADER]})
+        if updates:
+            try:
+                sheet.batch_update(updates)
+            except Exception:
+                # Indeks sudah diubah oleh diff; baca ulang sheet pada percobaan berikutnya
+                self._row_index = None
+                raise
+        self._has_header = True
+        self._snapshot = {k: float(v) for k, v in cost_dict.items()}
+
+    def _index_matches(self, sheet):
+        """Apakah nama produk di kolom A masih berada di baris yang diindeks"""
+        names = [str(name) for name in sheet.col_values(1)[1:]]
+        expected = [""] * max(self._row_index.values(), default=1)
+        for name, row in self._row_index.items():
+            expected[row - 1] = name
+        while names and not names[-1]:
+            names.pop()
+        return names == expected[1:]
+
+    def _rewrite(self, sheet, cost_dict):
+        """Menulis ulang seluruh sheet dari ``cost_dict`` dan membangun ulang indeks"""
+        rows = [self.HEADER] + [[name, float(value)] for name, value in cost_dict.items()]
+        # Baris lama di bawah data baru dikosongkan
+        rows += [["", ""]] * max(0, len(sheet.get_all_values()) - len(rows))
+        self._row_index = None
+        sheet.batch_update([{"range": f"A1:B{len(rows)}", "values": rows}])
+        self._row_index = {name: row for row, name in enumerate(cost_dict, start=2)}
+        self._has_header = True
+        self._snapshot = {k: float(v) for k, v in cost_dict.items()}
+
+    def _diff_updates(self, cost_dict):
+        """Menghitung perubahan sel terhadap isi sheet terakhir.
+
+        Baris produk yang dihapus diisi dengan baris terakhir lalu baris
+        terakhir dikosongkan, sehingga data tetap rapat tanpa menulis ulang
+        seluruh sheet.
+        """
+        row_index = self._row_index
+        rows = {}  # nomor baris -> [nama, biaya]
+        cleared = set()
+
+        # Hapus produk dengan memindahkan baris terakhir ke posisinya
+        for name in [k for k in self._snapshot if k not in cost_dict]:
+            row = row_index.pop(name)
+            last_row = max(row_index.values(), default=row)
+            if last_row > row:
+                last_name = next(k for k, r in row_index.items() if r == last_row)
+                row_index[last_name] = row
+                rows[row] = [last_name, self._current_value(last_name, cost_dict)]
+                rows.pop(last_row, None)
+                cleared.add(last_row)
+            else:
+                rows.pop(row, None)
+                cleared.add(row)
+
+        # Tambah atau ubah produk
+        next_row = max(row_index.values(), default=1) + 1
+        for name, value in cost_dict.items():
+            value = float(value)
+            if name in row_index:
+                if self._snapshot.get(name) != value and row_index[name] not in rows:
+                    rows[row_index[name]] = [None, value]
+            else:
+                row_index[name] = next_row
+                rows[next_row] = [name, value]
+                cleared.discard(next_row)
+                next_row += 1
+
+        updates = []
+        for row, (name, value) in sorted(rows.items()):
+            if name is None:
+                updates.append({"range": f"B{row}", "values": [[value]]})
+            else:
+                updates.append({"range": f"A{row}:B{row}", "values": [[name, value]]})
+        for row in sorted(cleared):
+            updates.append({"range": f"A{row}:B{row}", "values": [["", ""]]})
+        return updates
+
+    def _current_value(self, name, cost_dict):
+        return float(cost_dict.get(name, self._snapshot.get(name, 0.0)))
+
+
+class LocalWorksheet:
+    """Worksheet lokal di memori dengan subset API gspread yang dipakai CostManager"""
+
+    def __init__(self, values=None):
+        self.values = [list(row) for row in (values or [])]
+        self.requests = []
+
+    def get_all_values(self, **kwargs):
+        # Seperti gspread: baris kosong di ujung tidak dikembalikan
+        rows = [list(row) for row in self.values]
+        while rows and not any(rows[-1]):
+            rows.pop()
+        return rows
+
+    def col_values(self, col, **kwargs):
+        return [row[col - 1] if col - 1 < len(row) else "" for row in self.get_all_values()]
+
+    def get_all_records(self):
+        values = self.get_all_values()
+        if not values:
+            return []
+        return [dict(zip(values[0], row)) for row in values[1:]]
+
+    def batch_update(self, data, **kwargs):
+        self.requests.append(data)
+        for item in data:
+            self.update(values=item["values"], range_name=item["range"])
+
+    def update(self, values=None, range_name="A1", **kwargs):
+        match = re.match(r"([A-Z]+)(\d+)", range_name)
+        col = ord(match.group(1)) - ord("A")
+        row = int(match.group(2)) - 1
+        for r, row_values in enumerate(values):
+            while len(self.values) <= row + r:
+                self.values.append([])
+            target = self.values[row + r]
+            while len(target) < col + len(row_values):
+                target.append("")
+            target[col:col + len(row_values)] = row_values
+
+    def clear(self):
+        self.values = []
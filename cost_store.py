@@ -0,0 +1,292 @@
+# cost_store.py
+"""Penyimpanan biaya produk yang bisa dipilih lewat konfigurasi.
+
+``TIKTOKDATA_COST_BACKEND`` memilih backend:
+
+- ``sheets`` (bawaan): cache SQLite lokal (CostCache) yang disinkronkan
+  di latar dengan Google Sheets (CostManager).
+- ``json`` / ``csv``: satu file lokal, dibaca ulang hanya jika berubah.
+- ``sqlite``: tabel SQLite dengan primary key pada nama produk.
+
+Backend lokal tidak memakai jaringan sama sekali. ``TIKTOKDATA_COST_PATH``
+mengganti lokasi file bawaan di direktori penyimpanan.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+HEADER = ["product_name", "cost_per_unit"]
+
+
+class CostStore(ABC):
+    """Antarmuka penyimpanan biaya yang dipakai UI dan batch.
+
+    Subkelas wajib mengimplementasikan ``load_cost_data`` dan
+    ``save_cost_data`` (kelas tanpa keduanya gagal saat dibuat); metode
+    status dan sinkronisasi bawaan cocok untuk penyimpanan lokal yang tidak
+    pernah usang. ``set_cost`` dan ``delete_cost`` bawaan membaca lalu
+    menulis ulang seluruh isi; backend yang bisa mengubah satu baris
+    menimpanya.
+    """
+
+    last_error = None
+
+    @abstractmethod
+    def load_cost_data(self, wait=True):
+        """dict nama produk -> biaya per unit"""
+
+    @abstractmethod
+    def save_cost_data(self, cost_dict):
+        """Mengganti seluruh isi penyimpanan dengan ``cost_dict``"""
+
+    def get_cost(self, product_name, default=0.0):
+        """Biaya satu produk"""
+        return self.load_cost_data().get(product_name, default)
+
+    def set_cost(self, product_name, cost):
+        """Menulis biaya satu produk tanpa mengubah produk lain"""
+        costs = self.load_cost_data()
+        costs[product_name] = float(cost)
+        self.save_cost_data(costs)
+
+    def delete_cost(self, product_name):
+        """Menghapus biaya satu produk tanpa mengubah produk lain"""
+        costs = self.load_cost_data()
+        if costs.pop(product_name, None) is not None:
+            self.save_cost_data(costs)
+
+    def request_revalidation(self):
+        pass
+
+    def last_synced(self):
+        return None
+
+    def status(self):
+        """Ringkasan status untuk indikator di UI"""
+        return {
+            'last_synced': self.last_synced(),
+            'stale': False,
+            'pending_writes': False,
+            'syncing': False,
+            'last_error': self.last_error,
+        }
+
+
+class FileCostStore(CostStore):
+    """Biaya dalam satu file lokal dengan indeks dict di memori.
+
+    File dibaca ulang hanya jika waktu modifikasinya berubah, dan ditulis
+    lewat file sementara lalu ``os.replace`` agar pembaca tidak pernah
+    melihat file setengah jadi.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._costs = None
+        self._mtime = None
+
+    def load_cost_data(self, wait=True):
+        with self._lock:
+            return dict(self._index())
+
+    def get_cost(self, product_name, default=0.0):
+        with self._lock:
+            return self._index().get(product_name, default)
+
+    def save_cost_data(self, cost_dict):
+        costs = {str(name): float(cost) for name, cost in cost_dict.items()}
+        with self._lock:
+            self._save(costs)
+
+    def set_cost(self, product_name, cost):
+        with self._lock:
+            costs = dict(self._index())
+            costs[str(product_name)] = float(cost)
+            self._save(costs)
+
+    def delete_cost(self, product_name):
+        with self._lock:
+            costs = dict(self._index())
+            if costs.pop(product_name, None) is not None:
+                self._save(costs)
+
+    def _save(self, costs):
+        # Dipanggil dengan _lock sudah dipegang
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        self._write(temp_path, costs)
+        os.replace(temp_path, self.path)
+        self._costs = costs
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def _index(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._costs is None or mtime != self._mtime:
+            self._costs = self._read() if mtime is not None else {}
+            self._mtime = mtime
+        return self._costs
+
+    @abstractmethod
+    def _read(self):
+        """Isi file sebagai dict nama produk -> biaya"""
+
+    @abstractmethod
+    def _write(self, path, costs):
+        """Menulis ``costs`` ke ``path``"""
+
+
+class JsonCostStore(FileCostStore):
+    """Objek JSON nama produk -> biaya, format yang sama dengan ekspor biaya di UI"""
+
+    def _read(self):
+        with open(self.path, encoding='utf-8') as f:
+            return {str(name): float(cost) for name, cost in json.load(f).items()}
+
+    def _write(self, path, costs):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(costs, f, ensure_ascii=False, indent=2)
+
+
+class CsvCostStore(FileCostStore):
+    """CSV dengan kolom product_name dan cost_per_unit, seperti Google Sheet"""
+
+    def _read(self):
+        with open(self.path, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))
+        header = [h.strip() for h in rows[0]] if rows else []
+        # Tanpa header yang dikenal: kolom pertama nama, kolom kedua biaya
+        has_header = HEADER[0] in header
+        name_col = header.index(HEADER[0]) if has_header else 0
+        cost_col = header.index(HEADER[1]) if HEADER[1] in header else 1
+
+        costs = {}
+        for row in rows[1:] if has_header else rows:
+            name = row[name_col] if name_col < len(row) else ""
+            if not name:
+                continue
+            cost = row[cost_col].strip() if cost_col < len(row) else ""
+            costs[name] = float(cost) if cost else 0.0
+        return costs
+
+    def _write(self, path, costs):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(costs.items())
+
+
+class SqliteCostStore(CostStore):
+    """Biaya dalam tabel SQLite; pencarian per produk memakai primary key"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS costs ("
+                "product_name TEXT PRIMARY KEY, cost_per_unit REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load_cost_data(self, wait=True):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT product_name, cost_per_unit FROM costs").fetchall()
+        return {name: float(cost) for name, cost in rows}
+
+    def get_cost(self, product_name, default=0.0):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cost_per_unit FROM costs WHERE product_name = ?", (product_name,)
+            ).fetchone()
+        return float(row[0]) if row else default
+
+    def set_cost(self, product_name, cost):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO costs (product_name, cost_per_unit) VALUES (?, ?)",
+                (str(product_name), float(cost))
+            )
+
+    def delete_cost(self, product_name):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM costs WHERE product_name = ?", (product_name,))
+
+    def save_cost_data(self, cost_dict):
+        """Hanya baris yang berubah yang ditulis, dalam satu transaksi"""
+        with self._lock:
+            current = self.load_cost_data()
+            upserts = [
+                (str(name), float(value)) for name, value in cost_dict.items()
+                if current.get(name) != float(value)
+            ]
+            deletes = [(name,) for name in current if name not in cost_dict]
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO costs (product_name, cost_per_unit) VALUES (?, ?)", upserts
+                )
+                conn.executemany("DELETE FROM costs WHERE product_name = ?", deletes)
+
+
+def _sheets_remote():
+    # Diimpor saat sinkronisasi pertama saja: gspread lambat dimuat
+    from cost_manager import CostManager
+    return CostManager()
+
+
+def _sheets_store(path=None):
+    from cost_cache import CostCache
+    return CostCache(_sheets_remote, path=path)
+
+
+# backend -> (pembuat, nama file bawaan di direktori penyimpanan)
+COST_BACKENDS = {
+    'sheets': (_sheets_store, 'cost_cache.sqlite'),
+    'json': (JsonCostStore, 'costs.json'),
+    'csv': (CsvCostStore, 'costs.csv'),
+    'sqlite': (SqliteCostStore, 'costs.sqlite'),
+}
+
+FILE_EXTENSIONS = {
+    '.json': 'json',
+    '.csv': 'csv',
+    '.sqlite': 'sqlite',
+    '.db': 'sqlite',
+}
+
+
+def open_cost_store(backend=None, path=None):
+    """Membuat penyimpanan biaya sesuai konfigurasi (argumen atau environment)"""
+    backend = backend or os.environ.get('TIKTOKDATA_COST_BACKEND', 'sheets')
+    if backend not in COST_BACKENDS:
+        raise ValueError(f"Backend biaya tidak dikenal: {backend} (pilihan: {', '.join(COST_BACKENDS)})")
+    factory, file_name = COST_BACKENDS[backend]
+    path = path or os.environ.get('TIKTOKDATA_COST_PATH') or os.path.join(
+        os.environ.get('TIKTOKDATA_STORE_DIR', '.data_store'), file_name
+    )
+    return factory(path)
+
+
+def file_cost_store(path):
+    """Penyimpanan biaya lokal dengan backend sesuai ekstensi file"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FILE_EXTENSIONS:
+        raise ValueError(f"Format file biaya tidak didukung: {path} (pilihan: {', '.join(FILE_EXTENSIONS)})")
+    return open_cost_store(FILE_EXTENSIONS[extension], path)
@@ -2,9 +2,7 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from display_format import show_table
 
 class DataAnalysis:
     
@@ -32,16 +30,8 @@ class DataAnalysis:
                 (st.session_state.summary_data['Profit Margin %'] >= min_margin)
             ]
             
-            # Format untuk tampilan
-            display_data = filtered_data.copy()
-            display_data['Revenue'] = display_data['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-            display_data['Total Cost'] = display_data['Total Cost'].apply(lambda x: f"Rp {x:,.0f}")
-            display_data['Profit'] = display_data['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-            display_data['Share 60%'] = display_data['Share 60%'].apply(lambda x: f"Rp {x:,.0f}")
-            display_data['Share 40%'] = display_data['Share 40%'].apply(lambda x: f"Rp {x:,.0f}")
-            display_data['Profit Margin %'] = display_data['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-            
-            st.dataframe(display_data, use_container_width=True, hide_index=True)
+            # Format tampilan lewat konfigurasi kolom; nilai tetap numerik
+            show_table(filtered_data)
             
             # Ringkasan statistik
             st.markdown("**📊 Ringkasan Data Tersaring**")
@@ -60,15 +50,13 @@ class DataAnalysis:
                 st.metric("Margin Rata-rata", f"{avg_margin:.1f}%")
             
             # Tambahkan perbandingan dengan total bisnis aktual
-            if st.session_state.merged_data is not None:
+            if st.session_state.aggregates is not None:
                 st.markdown("---")
                 st.markdown("**🔍 Perbandingan Total Bisnis**")
                 
                 # Hitung total bisnis aktual (sama seperti Dasbor Kinerja)
-                unique_orders = st.session_state.merged_data.drop_duplicates(subset=['Order ID'])
-                actual_total_revenue = unique_orders['Total settlement amount'].sum()
-                actual_total_cost = st.session_state.summary_data['Total Cost'].sum()
-                actual_total_profit = actual_total_revenue - actual_total_cost
+                actual_total_revenue = st.session_state.aggregates.total_revenue
+                actual_total_profit = st.session_state.aggregates.total_profit
                 
                 comp_col1, comp_col2, comp_col3 = st.columns(3)
                 
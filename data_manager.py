@@ -1,36 +1,206 @@
 import pandas as pd
 from datetime import datetime
+from cost_attribution import CostAttribution
+from aggregates import DatasetAggregates
+from memory_optimizer import compact_frame
+from settlement_index import SettlementIndex, SettlementIndexStore
+from instrumentation import span
+from ingestion import frame_hash
+
+def frame_fingerprint(df):
+    """Sidik jari DataFrame input untuk kunci cache pipeline.
+
+    Memakai hash isi file yang dicatat UploadCache hanya untuk frame yang
+    persis dikembalikan cache itu; frame turunan atau lainnya di-hash
+    seluruh isinya.
+    """
+    content_hash = frame_hash(df)
+    if content_hash is not None:
+        return (content_hash, df.shape)
+    return (int(pd.util.hash_pandas_object(df, index=True).sum()), df.shape)
+
+# Tahap pipeline process_data, dilaporkan ke callback progress
+PROCESS_STAGES = ['filter', 'index', 'merge', 'aggregate', 'cost']
+
+def _no_progress(stage):
+    pass
 
 class DataManager:
-    def process_data(self, pesanan_data, income_data, cost_data):
-        """Memproses dan menggabungkan data"""
+    def __init__(self, settlement_store=None):
+        # Indeks settlement per isi data pendapatan, tersimpan di disk
+        self.settlement_store = settlement_store or SettlementIndexStore()
+        # Hasil tiap tahap disimpan bersama kunci inputnya: {tahap: (kunci, hasil)}
+        self._stages = {}
+        # Produk pada hasil terakhir yang belum memiliki entri biaya
+        self.missing_cost_products = []
+        # Agregat bersama (DatasetAggregates) untuk hasil terakhir
+        self.aggregates = None
+        # Ukuran memori data gabungan sebelum/sesudah dipadatkan
+        self.memory_report = None
+        # Order ID pesanan tanpa settlement dan settlement tanpa pesanan pada hasil terakhir
+        self.unmatched_orders = []
+        self.unmatched_settlements = None
+        # Hasil per bulan untuk PartitionedDataset: {bulan: (versi, hasil _merge_and_group)}
+        self._partitions = {}
+        # (root, generation) dataset asal hasil di _partitions
+        self._partitions_source = None
+
+    def _cached_stage(self, stage, key, compute):
+        """Menjalankan tahap pipeline hanya jika kunci inputnya berubah"""
+        cached = self._stages.get(stage)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        result = compute()
+        self._stages[stage] = (key, result)
+        return result
+
+    def clear_cache(self):
+        self._stages.clear()
+
+    def process_data(self, pesanan_data, income_data, cost_data, progress=None):
+        """Memproses dan menggabungkan data.
+
+        Filter, dedupe, merge dan groupby hanya dihitung ulang untuk sisi
+        input yang berubah; perubahan biaya saja hanya menghitung ulang
+        kolom biaya dan profit. ``progress`` (opsional) dipanggil dengan
+        nama tahap dari PROCESS_STAGES di awal setiap tahap. Setiap tahap
+        dicatat sebagai span instrumentasi.
+        """
+        with span('process_data', rows_in=len(pesanan_data) + len(income_data)) as total:
+            merged, summary = self._process_data(pesanan_data, income_data, cost_data, progress or _no_progress)
+            total.rows_out = len(merged) if merged is not None else 0
+        return merged, summary
+    
+    def _process_data(self, pesanan_data, income_data, cost_data, progress):
+        with span('process_data.fingerprint', rows_in=len(pesanan_data) + len(income_data)):
+            pesanan_key = frame_fingerprint(pesanan_data)
+            income_key = frame_fingerprint(income_data)
+
         # Filter pesanan selesai
-        df1 = pesanan_data[pesanan_data['Order Status'] == 'Selesai']
+        progress('filter')
+        with span('process_data.filter', rows_in=len(pesanan_data)) as stage:
+            df1 = self._cached_stage(
+                'filtered', pesanan_key,
+                lambda: pesanan_data[pesanan_data['Order Status'] == 'Selesai']
+            )
+            stage.rows_out = len(df1)
         
-        # Hapus duplikat dari data pendapatan
-        df2 = income_data.drop_duplicates(subset=['Order/adjustment ID'])
+        # Indeks settlement: semua baris penyesuaian per Order ID dijumlahkan
+        progress('index')
+        with span('process_data.index', rows_in=len(income_data)) as stage:
+            settlements = self._cached_stage(
+                'settlements', income_key,
+                lambda: self.settlement_store.get_or_build(income_data, income_key)
+            )
+            stage.rows_out = len(settlements)
         
-        # Gabungkan data
-        merged = pd.merge(df1, df2, left_on='Order ID', right_on='Order/adjustment ID', how='inner')
+        # Cocokkan pesanan dengan settlement dan buat ringkasan
+        merged, grouped, base_aggregates, self.memory_report, reconciliation = self._cached_stage(
+            'merged', (pesanan_key, income_key),
+            lambda: self._merge_and_group(df1, settlements, progress, fingerprint=repr((pesanan_key, income_key)))
+        )
+        self.unmatched_orders = reconciliation.unmatched_orders
+        self.unmatched_settlements = reconciliation.unmatched_settlements
+        
+        if merged is None:
+            self.aggregates = None
+            return None, None
+        
+        summary = grouped.copy()
+        
+        # Tambahkan perhitungan biaya
+        progress('cost')
+        with span('process_data.cost', rows_in=len(summary)) as stage:
+            self.missing_cost_products = CostAttribution(cost_data).apply(summary, 'TotalQty', 'Revenue')
+            self.aggregates = base_aggregates.with_costs(summary, cost_data)
+            stage.rows_out = len(summary)
+        
+        return merged, summary
+    
+    def _merge_and_group(self, df1, settlements, progress=_no_progress, fingerprint=None):
+        """Mencocokkan pesanan dengan indeks settlement lalu meringkas per produk"""
+        progress('merge')
+        with span('process_data.merge', rows_in=len(df1)) as stage:
+            reconciliation = settlements.reconcile(df1)
+            merged = reconciliation.merged
+            stage.rows_out = len(merged)
         
         if merged.empty:
+            return None, None, None, None, reconciliation
+        
+        progress('aggregate')
+        with span('process_data.aggregate', rows_in=len(merged)) as stage:
+            summary = merged.groupby(['Seller SKU', 'Product Name', 'Variation'], as_index=False).agg(
+                TotalQty=('Quantity', 'sum'),
+                Revenue=('Total settlement amount', 'sum')
+            )
+            aggregates = DatasetAggregates(merged, fingerprint=fingerprint)
+            stage.rows_out = len(summary)
+        
+        # Padatkan data gabungan yang disimpan di sesi
+        with span('process_data.compact', rows_in=len(merged)) as stage:
+            merged, memory_report = compact_frame(merged)
+            stage.rows_out = len(merged)
+        return merged, summary, aggregates, memory_report, reconciliation
+    
+    def process_dataset(self, dataset, cost_data, progress=None):
+        """Memproses PartitionedDataset multi-periode.
+
+        Hanya bulan yang versinya berubah sejak pemrosesan terakhir yang
+        digabung dan diringkas ulang; hasil per bulan lalu digabungkan
+        dengan hasil bulan lain yang sudah tersimpan.
+        """
+        progress = progress or _no_progress
+        dataset.refresh()
+        source = (dataset.root, dataset.generation)
+        if self._partitions_source != source:
+            # Dataset lain atau dataset yang sudah dikosongkan: versi bulan tidak sebanding
+            self._partitions = {}
+            self._partitions_source = source
+        months = dataset.months()
+        dirty = [m for m in months if self._partitions.get(m, (None,))[0] != dataset.month_version(m)]
+        
+        if dirty:
+            progress('index')
+            income = dataset.load_income()
+            settlements = SettlementIndex.from_income(
+                income if income is not None else pd.DataFrame(columns=['Order/adjustment ID', 'Total settlement amount'])
+            )
+            order_ids = dataset.order_index()['Order ID']
+            self.unmatched_settlements = settlements.settlements[~settlements.settlements.index.isin(order_ids)]
+            for month in dirty:
+                version = dataset.month_version(month)
+                self._partitions[month] = (version, self._merge_and_group(
+                    dataset.load_pesanan(month), settlements, progress,
+                    fingerprint=f"{dataset.root}|{dataset.generation}|{month}|{version}"
+                ))
+        
+        # Bulan yang sudah tidak ada di dataset tidak ikut digabungkan
+        for month in [m for m in self._partitions if m not in months]:
+            del self._partitions[month]
+        self.unmatched_orders = [
+            order_id for m in months for order_id in self._partitions[m][1][4].unmatched_orders
+        ]
+        parts = [self._partitions[m][1] for m in months if self._partitions[m][1][0] is not None]
+        if not parts:
+            self.aggregates = None
             return None, None
         
-        # Buat ringkasan
-        summary = merged.groupby(['Seller SKU', 'Product Name', 'Variation'], as_index=False).agg(
-            TotalQty=('Quantity', 'sum'),
-            Revenue=('Total settlement amount', 'sum')
+        # Gabungkan hasil per bulan
+        progress('aggregate')
+        summary = (
+            pd.concat([part[1] for part in parts], ignore_index=True)
+            .groupby(['Seller SKU', 'Product Name', 'Variation'], as_index=False)
+            .agg(TotalQty=('TotalQty', 'sum'), Revenue=('Revenue', 'sum'))
         )
+        fingerprint = repr([(m, dataset.month_version(m)) for m in months])
+        base_aggregates = DatasetAggregates.combine([part[2] for part in parts], fingerprint=f"{dataset.root}|{dataset.generation}|{fingerprint}")
+        merged, self.memory_report = compact_frame(pd.concat([part[0] for part in parts], ignore_index=True))
         
         # Tambahkan perhitungan biaya
-        summary['Cost per Unit'] = summary['Product Name'].apply(
-            lambda x: self.get_product_cost(x, cost_data)
-        )
-        summary['Total Cost'] = summary['TotalQty'] * summary['Cost per Unit']
-        summary['Profit'] = summary['Revenue'] - summary['Total Cost']
-        summary['Profit Margin %'] = (summary['Profit'] / summary['Revenue'] * 100).round(2)
-        summary['Share 60%'] = summary['Profit'] * 0.6
-        summary['Share 40%'] = summary['Profit'] * 0.4
+        progress('cost')
+        self.missing_cost_products = CostAttribution(cost_data).apply(summary, 'TotalQty', 'Revenue')
+        self.aggregates = base_aggregates.with_costs(summary, cost_data)
         
         return merged, summary
     
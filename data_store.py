@@ -0,0 +1,91 @@
+# data_store.py
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from columns import DATE_COLUMNS, PESANAN_COLUMNS, INCOME_COLUMNS, NUMERIC_COLUMNS
+
+STORE_COLUMNS = {
+    'pesanan': PESANAN_COLUMNS + DATE_COLUMNS,
+    'income': INCOME_COLUMNS + DATE_COLUMNS,
+}
+
+
+def project_columns(df, kind):
+    """Menyisakan kolom yang dipakai saja dengan tipe data yang konsisten"""
+    columns = [col for col in STORE_COLUMNS[kind] if col in df.columns]
+    projected = df[columns].copy()
+
+    for col in columns:
+        if col in NUMERIC_COLUMNS:
+            projected[col] = pd.to_numeric(projected[col], errors='coerce')
+        else:
+            # ID, SKU, nama produk dan tanggal disimpan sebagai teks agar
+            # kedua sisi merge selalu bertipe sama
+            projected[col] = projected[col].astype('string')
+
+    return projected
+
+
+class ColumnarStore:
+    """Penyimpanan lokal file unggahan dalam format Arrow IPC.
+
+    Setiap file Excel dikonversi sekali menjadi ``<kind>_<hash>.arrow``;
+    sesi berikutnya membaca file tersebut lewat memory map. File ditulis
+    tanpa kompresi: buffer terkompresi harus didekompresi ke memori
+    sehingga memory map tidak berguna, sedangkan tanpa kompresi kolom
+    teks dan angka dibaca zero-copy dari halaman file (lebih besar di
+    disk, tetapi pemuatan hampir instan). ``compression='lz4'`` tetap
+    bisa dipilih jika ruang disk lebih penting.
+    """
+
+    def __init__(self, directory=None, compression='uncompressed', max_files=50):
+        self.directory = directory or os.environ.get('TIKTOKDATA_STORE_DIR', '.data_store')
+        self.compression = compression
+        self.max_files = max_files
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, kind, file_hash):
+        return os.path.join(self.directory, f"{kind}_{file_hash}.arrow")
+
+    def has(self, kind, file_hash):
+        return os.path.exists(self.path_for(kind, file_hash))
+
+    def load(self, kind, file_hash):
+        """Membaca data tersimpan, None jika belum ada"""
+        path = self.path_for(kind, file_hash)
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        os.utime(path)
+        return table.to_pandas()
+
+    def save(self, kind, file_hash, df):
+        """Menyimpan hasil proyeksi kolom dan mengembalikan DataFrame yang disimpan"""
+        projected = project_columns(df, kind)
+        path = self.path_for(kind, file_hash)
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(projected, tmp_path, compression=self.compression)
+        os.replace(tmp_path, path)
+        self._prune()
+        return projected
+
+    def _prune(self):
+        """Menghapus file yang paling lama tidak dipakai jika melebihi max_files"""
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith('.arrow')
+        ]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
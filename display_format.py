@@ -0,0 +1,39 @@
+# display_format.py
+
+import streamlit as st
+
+# Format printf untuk st.column_config; diterapkan di browser, nilai tetap numerik
+CURRENCY_FORMAT = "Rp %,.0f"
+PERCENT_FORMAT = "%.1f%%"
+QUANTITY_FORMAT = "%,d"
+
+CURRENCY_COLUMNS = [
+    'Revenue', 'Total Revenue', 'Daily Revenue', 'Total Cost', 'Cost per Unit',
+    'Profit', 'Share 60%', 'Share 40%', 'Total settlement amount'
+]
+PERCENT_COLUMNS = ['Profit Margin %']
+QUANTITY_COLUMNS = ['TotalQty', 'Total Quantity', 'Total Orders', 'Daily Quantity', 'Daily Orders', 'Settlement Lines']
+
+
+def column_config(columns):
+    """Konfigurasi kolom uang, persen dan kuantitas untuk st.dataframe.
+
+    Pemformatan dilakukan oleh Streamlit, bukan per sel di Python, sehingga
+    tabel tidak perlu disalin dan pengurutan kolom tetap numerik.
+    """
+    config = {}
+    for col in columns:
+        if col in CURRENCY_COLUMNS:
+            config[col] = st.column_config.NumberColumn(col, format=CURRENCY_FORMAT)
+        elif col in PERCENT_COLUMNS:
+            config[col] = st.column_config.NumberColumn(col, format=PERCENT_FORMAT)
+        elif col in QUANTITY_COLUMNS:
+            config[col] = st.column_config.NumberColumn(col, format=QUANTITY_FORMAT)
+    return config
+
+
+def show_table(df, **kwargs):
+    """st.dataframe dengan format angka bersama, lebar penuh dan tanpa index"""
+    kwargs.setdefault('use_container_width', True)
+    kwargs.setdefault('hide_index', True)
+    st.dataframe(df, column_config=column_config(df.columns), **kwargs)
@@ -0,0 +1,82 @@
+# figure_cache.py
+
+import threading
+from collections import OrderedDict
+
+# Properti trace yang berisi data per titik, dan perkiraan byte JSON per nilai
+ARRAY_PROPERTIES = ('x', 'y', 'z', 'text', 'hovertext', 'customdata')
+BYTES_PER_VALUE = 12
+LAYOUT_BYTES = 8 * 1024
+
+
+def _value_count(value):
+    if value is None or isinstance(value, str):
+        return 0
+    count = len(value)
+    first = value[0] if count else None
+    # Data 2D (heatmap z, customdata beberapa kolom)
+    if first is not None and not isinstance(first, str) and hasattr(first, '__len__'):
+        return count * len(first)
+    return count
+
+
+def estimate_figure_bytes(fig):
+    """Perkiraan ukuran JSON figur dari jumlah nilai data per trace, tanpa serialisasi"""
+    values = sum(
+        _value_count(getattr(trace, prop, None))
+        for trace in fig.data for prop in ARRAY_PROPERTIES
+    )
+    return values * BYTES_PER_VALUE + LAYOUT_BYTES
+
+
+class FigureCache:
+    """Cache LRU figur Plotly yang sudah dibangun, dipakai bersama oleh semua sesi.
+
+    Kunci berupa ``(sidik jari dataset, jenis grafik)``, jadi rerun atau sesi
+    lain yang melihat data dan biaya yang sama tidak membangun subplot,
+    histogram dan deret kumulatif lagi. Ukuran entri diperkirakan dari
+    jumlah titik data (tanpa serialisasi, karena st.plotly_chart sudah
+    menserialisasi figur saat dirender); entri dibuang mulai dari yang
+    paling lama tidak dipakai ketika total melebihi ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Mengembalikan figur untuk ``key``, memanggil ``build()`` hanya jika belum ada"""
+        fig = self.get(key)
+        if fig is None:
+            fig = build()
+            self.put(key, fig)
+        return fig
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, fig):
+        size = estimate_figure_bytes(fig)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            # Figur yang lebih besar dari batas tidak disimpan sama sekali
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (fig, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
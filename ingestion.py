@@ -0,0 +1,205 @@
+# ingestion.py
+
+import hashlib
+import io
+import threading
+import weakref
+import zipfile
+from collections import OrderedDict
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from columns import DATE_COLUMNS, PESANAN_COLUMNS, INCOME_COLUMNS
+from instrumentation import span
+
+# File di atas ukuran ini dibaca baris per baris agar memori tetap rendah
+STREAMING_THRESHOLD_BYTES = 20 * 1024 * 1024
+CHUNK_SIZE = 50_000
+
+
+def read_pesanan_excel(source):
+    """Membaca file Excel pesanan (baris kedua berisi keterangan kolom)"""
+    df = pd.read_excel(source, header=0, skiprows=[1])
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def read_income_excel(source):
+    """Membaca file Excel pendapatan"""
+    df = pd.read_excel(source)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def stream_excel(source, columns, skip_rows=(), row_filter=None, chunk_size=CHUNK_SIZE):
+    """Membaca lembar pertama secara streaming dalam potongan berukuran tetap.
+
+    Hanya kolom ``columns`` yang ada di file yang diambil, dan baris yang
+    tidak lolos ``row_filter`` (dict kolom -> nilai) dibuang saat dibaca,
+    sehingga memori puncak sebanding dengan data yang disimpan saja.
+    """
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+        positions = {name: i for i, name in enumerate(header)}
+
+        kept = [col for col in columns if col in positions]
+        kept_idx = [positions[col] for col in kept]
+        filters = [(positions[col], value) for col, value in (row_filter or {}).items()]
+
+        chunks = []
+        buffer = []
+        for row_number, row in enumerate(rows, start=1):
+            if row_number in skip_rows:
+                continue
+            if any(idx >= len(row) or row[idx] != value for idx, value in filters):
+                continue
+            buffer.append([row[idx] if idx < len(row) else None for idx in kept_idx])
+            if len(buffer) >= chunk_size:
+                chunks.append(pd.DataFrame(buffer, columns=kept))
+                buffer = []
+        if buffer or not chunks:
+            chunks.append(pd.DataFrame(buffer, columns=kept))
+    finally:
+        workbook.close()
+
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def stream_pesanan_excel(source):
+    """Membaca pesanan selesai secara streaming dengan kolom yang dipakai saja"""
+    return stream_excel(
+        source,
+        PESANAN_COLUMNS + DATE_COLUMNS,
+        skip_rows={1},
+        row_filter={'Order Status': 'Selesai'}
+    )
+
+
+def stream_income_excel(source):
+    """Membaca data pendapatan secara streaming dengan kolom yang dipakai saja"""
+    return stream_excel(source, INCOME_COLUMNS + DATE_COLUMNS)
+
+
+READERS = {
+    'pesanan': read_pesanan_excel,
+    'income': read_income_excel,
+}
+
+STREAMING_READERS = {
+    'pesanan': stream_pesanan_excel,
+    'income': stream_income_excel,
+}
+
+
+def read_upload(file_bytes, kind):
+    """Memilih pembaca penuh atau streaming berdasarkan ukuran file"""
+    if len(file_bytes) > STREAMING_THRESHOLD_BYTES:
+        try:
+            return STREAMING_READERS[kind](io.BytesIO(file_bytes))
+        except (InvalidFileException, zipfile.BadZipFile):
+            # Format lama (.xls) tidak didukung openpyxl
+            pass
+    return READERS[kind](io.BytesIO(file_bytes))
+
+
+def content_hash(file_bytes):
+    """Hash isi file unggahan, dipakai sebagai kunci cache"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+# id(DataFrame) -> (weakref, hash isi file). Tidak memakai df.attrs karena
+# pandas menyalin attrs ke frame turunan (filter, assign, copy).
+_frame_hashes = {}
+
+
+def register_frame_hash(df, file_hash):
+    """Mencatat hash isi file untuk DataFrame hasil parsing ini saja"""
+    key = id(df)
+    _frame_hashes[key] = (weakref.ref(df, lambda _: _frame_hashes.pop(key, None)), file_hash)
+
+
+def frame_hash(df):
+    """Hash isi file jika ``df`` adalah frame yang dicatat UploadCache, selain itu None"""
+    entry = _frame_hashes.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    return None
+
+
+class UploadCache:
+    """Cache hasil parsing file unggahan berdasarkan hash isi file.
+
+    Entri dibuang mulai dari yang paling lama tidak dipakai (LRU) ketika
+    total ukuran DataFrame melebihi ``max_bytes``. Jika ``store`` diberikan,
+    hasil parsing juga disimpan ke ``ColumnarStore`` sehingga sesi atau
+    proses berikutnya tidak perlu membaca Excel lagi.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, store=None):
+        self.max_bytes = max_bytes
+        self.store = store
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def load(self, uploaded_file, kind):
+        """Mengembalikan DataFrame untuk file unggahan, parsing hanya sekali per isi file"""
+        file_bytes = uploaded_file.getvalue()
+        file_hash = content_hash(file_bytes)
+        key = (kind, file_hash)
+
+        # Dipanggil di setiap rerun selama file terpasang; hit memori tidak dicatat sebagai span
+        df = self.get(key)
+        if df is not None:
+            return df
+
+        with span(f'upload.{kind}', file_mb=round(len(file_bytes) / 1024 ** 2, 2)) as stage:
+            df = self._load_uncached(file_bytes, file_hash, kind, stage)
+            # Dipakai DataManager sebagai sidik jari input tanpa hashing ulang
+            register_frame_hash(df, file_hash)
+            self.put(key, df)
+            stage.rows_out = len(df)
+        return df
+
+    def _load_uncached(self, file_bytes, file_hash, kind, stage):
+        if self.store is not None:
+            df = self.store.load(kind, file_hash)
+            if df is not None:
+                stage.attrs['source'] = 'store'
+                return df
+        stage.attrs['source'] = 'parse'
+        df = read_upload(file_bytes, kind)
+        if self.store is not None:
+            df = self.store.save(kind, file_hash, df)
+        return df
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, df):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            # Entri yang lebih besar dari batas tidak disimpan sama sekali
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
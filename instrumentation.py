@@ -0,0 +1,130 @@
+# instrumentation.py
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger('tiktokdata.metrics')
+
+
+def current_memory():
+    """Memori resident proses dalam byte, None jika tidak bisa dibaca di platform ini"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def row_count(obj):
+    """Jumlah baris DataFrame/dict/list, None untuk objek lain"""
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+class Span:
+    """Satu tahap terukur: durasi, baris masuk/keluar dan perubahan memori"""
+
+    def __init__(self, name, rows_in=None, **attrs):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.seconds = None
+        self.memory_delta = None
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started_at': round(self.started_at, 3),
+            'seconds': round(self.seconds, 4) if self.seconds is not None else None,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'memory_delta_mb': round(self.memory_delta / 1024 ** 2, 2) if self.memory_delta is not None else None,
+            'error': self.error,
+            'thread': self.thread,
+            **self.attrs,
+        }
+
+
+class Instrumentation:
+    """Pengumpul span tahap pipeline.
+
+    Span terakhir disimpan di memori untuk panel debug, dan setiap span
+    ditulis sebagai satu baris JSON ke ``path`` serta ke logger
+    ``tiktokdata.metrics``. File yang melebihi ``max_file_bytes`` diganti
+    nama menjadi ``<path>.1`` (menimpa rotasi sebelumnya), sehingga
+    metrik di disk paling banyak dua kali batas itu. Aman dipakai dari
+    thread job latar.
+    """
+
+    def __init__(self, path=None, max_spans=200, max_file_bytes=5 * 1024 * 1024):
+        self.path = path or os.environ.get('TIKTOKDATA_METRICS_FILE') or os.path.join(
+            os.environ.get('TIKTOKDATA_STORE_DIR', '.data_store'), 'metrics.jsonl'
+        )
+        self.max_file_bytes = max_file_bytes
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, rows_in=None, **attrs):
+        """Mengukur blok ``with``; isi ``span.rows_out`` di dalam blok jika relevan"""
+        span = Span(name, rows_in=rows_in, **attrs)
+        memory_before = current_memory()
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.seconds = time.perf_counter() - start
+            memory_after = current_memory()
+            if memory_before is not None and memory_after is not None:
+                span.memory_delta = memory_after - memory_before
+            self.record(span)
+
+    def record(self, span):
+        record = span.to_dict()
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._spans.append(record)
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._rotate()
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError:
+                # Metrik tidak boleh menggagalkan pipeline
+                pass
+        logger.info(line)
+
+    def _rotate(self):
+        try:
+            if os.path.getsize(self.path) >= self.max_file_bytes:
+                os.replace(self.path, f"{self.path}.1")
+        except FileNotFoundError:
+            pass
+
+    def recent(self):
+        """Span terakhir, terbaru di akhir"""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+# Instans bersama untuk seluruh proses
+instrumentation = Instrumentation()
+span = instrumentation.span
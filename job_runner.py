@@ -0,0 +1,91 @@
+# job_runner.py
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Dilempar di batas tahap ketika job dibatalkan"""
+
+
+class Job:
+    """Status satu pekerjaan latar: tahap, progres, hasil dan pembatalan"""
+
+    def __init__(self, name, stages=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.stages = list(stages or [])
+        self.state = 'pending'
+        self.stage = None
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    def report(self, stage):
+        """Dipanggil pekerjaan di awal setiap tahap; gagal jika job dibatalkan"""
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+        self.stage = stage
+        if stage in self.stages:
+            self.progress = self.stages.index(stage) / len(self.stages)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def done(self):
+        return self.state in ('done', 'failed', 'cancelled')
+
+
+class JobRunner:
+    """Menjalankan pekerjaan berat di thread pool agar skrip Streamlit tidak terblokir.
+
+    Thread dipakai (bukan proses) karena DataFrame input dan hasil cukup
+    besar untuk di-pickle, sementara operasi pandas sebagian besar
+    melepas GIL.
+    """
+
+    def __init__(self, max_workers=2, keep_seconds=3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.keep_seconds = keep_seconds
+
+    def submit(self, name, fn, *args, stages=None, **kwargs):
+        """Menjadwalkan ``fn(*args, progress=job.report, **kwargs)`` dan mengembalikan Job"""
+        job = Job(name, stages)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        job.state = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = fn(*args, progress=job.report, **kwargs)
+            job.progress = 1.0
+            job.state = 'done'
+        except JobCancelled:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.error = str(e)
+            job.state = 'failed'
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        """Melupakan job selesai yang sudah lama"""
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -1,9 +1,8 @@
 import streamlit as st
+from datetime import datetime
 from data_manager import DataManager
 from data_analysis import DataAnalysis
-from cost_manager import CostManager
-from report_generator import ReportGenerator
-from ui import show_data_upload_section, show_metrics_dashboard, show_cost_management, show_advanced_analytics
+from ui import get_cost_manager, sync_session_costs, show_cost_loading_status, show_report_export, start_processing_job, get_processing_job, show_processing_status, show_data_upload_section, show_metrics_dashboard, show_cost_management, show_advanced_analytics, show_debug_panel
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -23,14 +22,17 @@ def main():
     """, unsafe_allow_html=True)
     
     # Inisialisasi manajer data
-    data_manager = DataManager()
-    cost_manager = CostManager()
-    report_generator = ReportGenerator()
+    if 'data_manager' not in st.session_state:
+        # Disimpan per sesi agar hasil tahap pipeline bisa dipakai ulang
+        st.session_state.data_manager = DataManager()
+    data_manager = st.session_state.data_manager
+    cost_manager = get_cost_manager()
     data_analysis = DataAnalysis()
     
     # Inisialisasi state sesi
-    if 'cost_data' not in st.session_state:
-        st.session_state.cost_data = cost_manager.load_cost_data()
+    # Cache lokal kosong: halaman tampil dulu, biaya menyusul dari sinkronisasi latar.
+    # Sesi yang sudah terbuka ikut memuat ulang setelah validasi ulang TTL di latar.
+    sync_session_costs()
     if 'pesanan_data' not in st.session_state:
         st.session_state.pesanan_data = None
     if 'income_data' not in st.session_state:
@@ -39,6 +41,8 @@ def main():
         st.session_state.merged_data = None
     if 'summary_data' not in st.session_state:
         st.session_state.summary_data = None
+    if 'aggregates' not in st.session_state:
+        st.session_state.aggregates = None
     
     # Sidebar
     with st.sidebar:
@@ -54,57 +58,63 @@ def main():
         st.write(f"Pendapatan: {income_status}")
         st.write(f"Analisis: {processed_status}")
         
+        memory_report = data_manager.memory_report
+        if memory_report and st.session_state.merged_data is not None:
+            st.caption(
+                f"Memori data: {memory_report['before_bytes'] / 1024**2:,.1f} MB → "
+                f"{memory_report['after_bytes'] / 1024**2:,.1f} MB"
+            )
+        
         st.markdown("---")
         
         # Aksi cepat
         st.markdown("**⚡ Aksi Cepat:**")
         
-        if st.button("🔄 Proses Data", type="primary", use_container_width=True):
+        processing_job = get_processing_job()
+        if st.button("🔄 Proses Data", type="primary", use_container_width=True,
+                     disabled=(processing_job is not None and not processing_job.done) or st.session_state.cost_data_loading):
             if st.session_state.pesanan_data is not None and st.session_state.income_data is not None:
-                with st.spinner("Memproses data..."):
-                    merged, summary = data_manager.process_data(
-                        st.session_state.pesanan_data, 
-                        st.session_state.income_data, 
-                        st.session_state.cost_data
-                    )
-                    
-                    if merged is not None:
-                        st.session_state.merged_data = merged
-                        st.session_state.summary_data = summary
-                        st.success("✅ Data diproses!")
-                        st.rerun()
-                    else:
-                        st.error("❌ Tidak ditemukan data yang cocok")
+                start_processing_job()
             else:
                 st.warning("⚠️ Unggah kedua file terlebih dahulu")
         
+        # Progres pemrosesan latar dan pesan hasil terakhir
+        if get_processing_job() is not None:
+            show_processing_status()
+        message = st.session_state.pop('processing_message', None)
+        if message:
+            level, text = message
+            getattr(st, level)(text)
+        
         if st.session_state.summary_data is not None:
-            if st.button("📥 Ekspor Laporan", use_container_width=True):
-                try:
-                    excel_data = report_generator.create_excel_report(
-                        st.session_state.merged_data,
-                        st.session_state.summary_data,
-                        st.session_state.cost_data
-                    )
-                    
-                    st.download_button(
-                        label="💾 Unduh Excel",
-                        data=excel_data,
-                        file_name=f"income_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
-                except Exception as e:
-                    st.error(f"Kesalahan: {str(e)}")
+            show_report_export()
         
         st.markdown("---")
         
         # Statistik cepat biaya
-        if st.session_state.cost_data:
+        if st.session_state.cost_data_loading:
+            show_cost_loading_status()
+        elif st.session_state.cost_data:
             st.markdown("**💰 Data Biaya:**")
             st.write(f"Produk: {len(st.session_state.cost_data)}")
             avg_cost = sum(st.session_state.cost_data.values()) / len(st.session_state.cost_data)
             st.write(f"Biaya Rata-rata: Rp {avg_cost:,.0f}")
+        
+        # Indikator kesegaran cache biaya
+        sync_status = cost_manager.status()
+        if sync_status['last_synced']:
+            synced_at = datetime.fromtimestamp(sync_status['last_synced']).strftime('%H:%M:%S')
+            st.caption(f"Sinkron terakhir: {synced_at}")
+        if sync_status['syncing']:
+            st.caption("🔄 Menyinkronkan dengan Google Sheets...")
+        elif sync_status['pending_writes']:
+            st.caption("⏳ Perubahan biaya menunggu sinkronisasi")
+        elif sync_status['stale']:
+            st.caption("⚠️ Data biaya mungkin sudah usang")
+        if sync_status['last_error']:
+            st.caption(f"❌ Sinkronisasi gagal: {sync_status['last_error']}")
+        
+        show_debug_panel()
     
     # Tab konten utama
     tab1, tab2, tab3, tab4 = st.tabs([
@@ -0,0 +1,61 @@
+# memory_optimizer.py
+
+import numpy as np
+import pandas as pd
+
+from columns import DATE_COLUMNS
+
+# Kolom data gabungan yang masih dipakai setelah process_data
+MERGED_COLUMNS = ['Order ID', 'Seller SKU', 'Product Name', 'Variation', 'Quantity', 'Total settlement amount']
+CATEGORICAL_COLUMNS = ['Order ID', 'Seller SKU', 'Product Name', 'Variation']
+
+# Kolom teks lain dijadikan kategori jika rasio nilai unik di bawah batas ini
+CATEGORY_RATIO = 0.5
+
+
+def frame_memory(df):
+    """Ukuran memori DataFrame dalam byte (termasuk isi string)"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _downcast_numeric(series):
+    """Memperkecil tipe numerik tanpa mengubah nilai"""
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy()
+        if not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+            return pd.to_numeric(series.astype('int64'), downcast='integer')
+        as_float32 = series.astype('float32')
+        if np.array_equal(as_float32.to_numpy().astype('float64'), values, equal_nan=True):
+            return as_float32
+    return series
+
+
+def compact_frame(df, keep_columns=None):
+    """Membuang kolom yang tidak dipakai, mengubah teks berulang menjadi
+    categorical dan memperkecil tipe numerik.
+
+    Mengembalikan ``(frame_ringkas, laporan)`` dengan laporan berisi
+    ukuran memori sebelum dan sesudah.
+    """
+    before = frame_memory(df)
+    keep_columns = keep_columns or MERGED_COLUMNS + DATE_COLUMNS
+    columns = [col for col in df.columns if col in keep_columns]
+    compact = df[columns].copy()
+
+    for col in columns:
+        series = compact[col]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            compact[col] = _downcast_numeric(series)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if col in CATEGORICAL_COLUMNS or series.nunique(dropna=True) < CATEGORY_RATIO * len(series):
+                compact[col] = series.astype('category')
+
+    after = frame_memory(compact)
+    report = {
+        'before_bytes': before,
+        'after_bytes': after,
+        'dropped_columns': [col for col in df.columns if col not in columns],
+    }
+    return compact, report
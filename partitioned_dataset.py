@@ -0,0 +1,308 @@
+# partitioned_dataset.py
+
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: hanya kunci antar-thread
+    fcntl = None
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from columns import DATE_COLUMNS
+from data_store import project_columns
+from time_series import parse_dates
+
+UNKNOWN_MONTH = 'unknown'
+
+
+def dataset_root(shop=None):
+    """Direktori dataset untuk satu toko; tanpa nama toko dipakai dataset bersama"""
+    store = os.environ.get('TIKTOKDATA_STORE_DIR', '.data_store')
+    if not shop:
+        return os.path.join(store, 'dataset')
+    slug = re.sub(r'[^0-9a-z]+', '_', shop.lower()).strip('_') or 'toko'
+    return os.path.join(store, 'datasets', slug)
+
+
+class PartitionedDataset:
+    """Dataset lokal multi-periode yang dipartisi per bulan pesanan.
+
+    Ekspor pesanan baru ditambahkan sebagai file part di
+    ``pesanan/month=YYYY-MM/``; pesanan yang Order ID-nya sudah pernah
+    masuk dibuang berdasarkan indeks. Baris pendapatan disimpan di
+    ``income/``; baris yang persis sama dengan baris dari ekspor
+    sebelumnya dibuang, penyesuaian lain untuk ID yang sama tetap
+    disimpan.
+
+    Ekspor pesanan TikTok Shop umumnya tidak memiliki kolom tanggal,
+    sehingga bulan pesanan diambil dari ``Order created time(UTC)`` di
+    data pendapatan lewat ``income_index``. Pesanan yang pendapatannya
+    belum masuk disimpan di partisi ``unknown`` dan dipindahkan ke bulannya
+    begitu pendapatannya ditambahkan.
+
+    ``manifest.json`` menyimpan versi setiap bulan, yang naik setiap kali
+    data bulan itu (pesanan atau pendapatannya) berubah, sehingga
+    DataManager hanya perlu memproses ulang partisi yang berubah. ``generation`` berganti saat
+    dataset dikosongkan sehingga versi lama tidak tertukar dengan yang baru.
+
+    Penambahan dan pengosongan dijaga kunci thread dan kunci file
+    (``.lock``), sehingga beberapa sesi atau proses tidak saling menimpa
+    indeks dan manifest.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or dataset_root()
+        self._lock = threading.Lock()
+        self._make_dirs()
+        self.manifest = self._load_manifest()
+
+    def _make_dirs(self):
+        os.makedirs(os.path.join(self.root, 'pesanan'), exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'income'), exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Kunci tulis eksklusif; manifest dibaca ulang dari disk di dalamnya"""
+        with self._lock, open(os.path.join(self.root, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.manifest = self._load_manifest()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- manifest dan indeks ---
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.root, 'manifest.json')
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generation': uuid.uuid4().hex, 'months': {}}
+
+    def refresh(self):
+        """Membaca ulang manifest yang mungkin diubah proses lain"""
+        self.manifest = self._load_manifest()
+
+    @property
+    def generation(self):
+        # Manifest lama belum memiliki generation
+        return self.manifest.get('generation', 'initial')
+
+    def _save_manifest(self):
+        tmp_path = f"{self._manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _read_index(self, name, columns):
+        path = os.path.join(self.root, f"{name}.arrow")
+        if not os.path.exists(path):
+            return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in columns.items()})
+        return feather.read_table(path, memory_map=True).to_pandas()
+
+    def _write_index(self, name, df):
+        self._write_part(df, os.path.join(self.root, f"{name}.arrow"))
+
+    @staticmethod
+    def _write_part(df, path):
+        # Ditulis ke file sementara dulu agar pembaca tidak melihat file setengah jadi
+        feather.write_feather(df.reset_index(drop=True), f"{path}.tmp", compression='lz4')
+        os.replace(f"{path}.tmp", path)
+
+    def order_index(self):
+        """Order ID -> bulan partisi untuk semua pesanan yang sudah masuk"""
+        return self._read_index('order_index', {'Order ID': 'string', 'month': 'string'})
+
+    def months(self):
+        return sorted(self.manifest['months'])
+
+    def month_version(self, month):
+        return self.manifest['months'].get(month, 0)
+
+    def _bump(self, months):
+        for month in months:
+            self.manifest['months'][month] = self.month_version(month) + 1
+
+    # --- penambahan data ---
+    def append_pesanan(self, pesanan_data):
+        """Menambahkan pesanan selesai yang belum pernah masuk; mengembalikan bulan yang berubah"""
+        df = project_columns(pesanan_data[pesanan_data['Order Status'] == 'Selesai'], 'pesanan')
+        with self._locked():
+            return self._append_pesanan(df)
+
+    def _append_pesanan(self, df):
+        index = self.order_index()
+        df = df[~df['Order ID'].isin(index['Order ID'])]
+        if df.empty:
+            return []
+
+        df, months = with_order_months(df)
+        # Pesanan tanpa tanggal memakai bulan dari pendapatan yang sudah masuk
+        unknown = months == UNKNOWN_MONTH
+        if unknown.any():
+            income_months = df.loc[unknown, 'Order ID'].map(self.income_months())
+            months = months.mask(unknown, income_months.fillna(UNKNOWN_MONTH))
+        self._write_months(df, months)
+
+        new_index = pd.DataFrame({'Order ID': df['Order ID'], 'month': months}).drop_duplicates('Order ID')
+        self._write_index('order_index', pd.concat([index, new_index], ignore_index=True))
+
+        touched = sorted(months.unique())
+        self._bump(touched)
+        self._save_manifest()
+        return touched
+
+    def append_income(self, income_data):
+        """Menambahkan baris pendapatan baru; mengembalikan bulan pesanan yang terdampak"""
+        df, dates = normalize_dates(project_columns(income_data, 'income'))
+        if dates is None:
+            months = pd.Series(pd.NA, index=df.index, dtype='string')
+        else:
+            months = dates.dt.strftime('%Y-%m').astype('string')
+        with self._locked():
+            return self._append_income(df, months)
+
+    def _append_income(self, df, months):
+        # Ekspor yang tumpang tindih berisi baris yang sama persis; hanya itu yang dibuang
+        row_hashes = pd.util.hash_pandas_object(df, index=False)
+        ingested = self._income_index()
+        new_rows = ~row_hashes.isin(ingested['row_hash']).to_numpy()
+        df = df[new_rows]
+        if df.empty:
+            return []
+
+        self._write_part(df, os.path.join(self.root, 'income', f"part-{uuid.uuid4().hex}.arrow"))
+        self._write_index('income_index', pd.concat([ingested, pd.DataFrame({
+            'Order/adjustment ID': df['Order/adjustment ID'],
+            'row_hash': row_hashes[new_rows],
+            'month': months[new_rows],
+        })], ignore_index=True))
+
+        # Pendapatan untuk pesanan yang belum masuk akan ikut saat pesanannya ditambahkan
+        touched = set(self._place_unknown())
+        index = self.order_index()
+        touched.update(index.loc[index['Order ID'].isin(df['Order/adjustment ID']), 'month'])
+        if UNKNOWN_MONTH not in self.manifest['months']:
+            # Partisi unknown yang sudah kosong dihapus, bukan dinaikkan versinya
+            touched.discard(UNKNOWN_MONTH)
+        touched = sorted(touched)
+        self._bump(touched)
+        self._save_manifest()
+        return touched
+
+    def _income_index(self):
+        index = self._read_index(
+            'income_index', {'Order/adjustment ID': 'string', 'row_hash': 'uint64', 'month': 'string'}
+        )
+        if 'month' not in index.columns:
+            # Indeks lama belum menyimpan bulan pendapatan
+            index['month'] = pd.Series(pd.NA, index=index.index, dtype='string')
+        return index
+
+    def income_months(self):
+        """Order/adjustment ID -> bulan pesanan menurut data pendapatan"""
+        index = self._income_index().dropna(subset=['month'])
+        return index.drop_duplicates('Order/adjustment ID').set_index('Order/adjustment ID')['month']
+
+    def _write_months(self, df, months):
+        for month, part in df.groupby(months, sort=True):
+            directory = os.path.join(self.root, 'pesanan', f"month={month}")
+            os.makedirs(directory, exist_ok=True)
+            self._write_part(part, os.path.join(directory, f"part-{uuid.uuid4().hex}.arrow"))
+
+    def _place_unknown(self):
+        """Memindahkan pesanan ``unknown`` yang bulannya kini diketahui; mengembalikan bulan yang berubah"""
+        index = self.order_index()
+        income_months = self.income_months()
+        new_months = index['Order ID'].map(income_months).where(index['month'] == UNKNOWN_MONTH)
+        placed = new_months.notna()
+        if not placed.any():
+            return []
+
+        directory = os.path.join(self.root, 'pesanan', f"month={UNKNOWN_MONTH}")
+        old_parts = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.arrow')]
+        df = self.load_pesanan(UNKNOWN_MONTH)
+        months = df['Order ID'].map(income_months).fillna(UNKNOWN_MONTH)
+        # Part baru ditulis dulu, part lama baru dihapus setelahnya
+        self._write_months(df, months)
+        for path in old_parts:
+            os.remove(path)
+        if not (months == UNKNOWN_MONTH).any():
+            os.rmdir(directory)
+            del self.manifest['months'][UNKNOWN_MONTH]
+
+        index.loc[placed, 'month'] = new_months[placed]
+        self._write_index('order_index', index)
+        return sorted(set(new_months[placed]) | {UNKNOWN_MONTH})
+
+    def reset(self):
+        """Mengosongkan dataset: semua partisi, indeks dan versi bulan"""
+        with self._locked():
+            for name in ('pesanan', 'income'):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            for name in ('order_index.arrow', 'income_index.arrow'):
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    pass
+            self._make_dirs()
+            self.manifest = {'generation': uuid.uuid4().hex, 'months': {}}
+            self._save_manifest()
+
+    # --- pembacaan ---
+    def _read_parts(self, directory):
+        if not os.path.isdir(directory):
+            return None
+        paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.arrow')
+        )
+        if not paths:
+            return None
+        frames = [feather.read_table(path, memory_map=True).to_pandas() for path in paths]
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def load_pesanan(self, month):
+        return self._read_parts(os.path.join(self.root, 'pesanan', f"month={month}"))
+
+    def load_income(self):
+        return self._read_parts(os.path.join(self.root, 'income'))
+
+
+ISO_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def normalize_dates(df):
+    """Menulis ulang kolom tanggal pertama sebagai teks ISO.
+
+    Tanggal di-parse sekali untuk seluruh ekspor dengan ``parse_dates``
+    (sadar dd/mm/yyyy), sehingga setiap file part terbaca dengan format
+    yang sama. Mengembalikan ``(df, dates)``; ``dates`` None jika tidak
+    ada kolom tanggal.
+    """
+    date_column = next((col for col in DATE_COLUMNS if col in df.columns), None)
+    if date_column is None:
+        return df, None
+    dates = parse_dates(df[date_column])
+    return df.assign(**{date_column: dates.dt.strftime(ISO_DATE_FORMAT).astype('string')}), dates
+
+
+def with_order_months(df):
+    """Bulan pesanan (YYYY-MM); hanya baris tanpa tanggal yang masuk ``unknown``"""
+    df, dates = normalize_dates(df)
+    if dates is None:
+        return df, pd.Series(UNKNOWN_MONTH, index=df.index)
+    return df, dates.dt.strftime('%Y-%m').fillna(UNKNOWN_MONTH).astype(str)
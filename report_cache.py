@@ -0,0 +1,61 @@
+# report_cache.py
+
+import hashlib
+import os
+import shutil
+
+from cost_attribution import cost_fingerprint
+
+
+def report_key(aggregates, cost_data, extension='xlsx'):
+    """Kunci laporan dari sidik jari dataset terproses (tanpa biaya) dan tabel biaya saat ini"""
+    raw = f"{aggregates.base_fingerprint}|{cost_fingerprint(cost_data)}|{extension}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    """Menyimpan file laporan yang sudah jadi di disk, dengan batas jumlah entri (LRU)"""
+
+    def __init__(self, directory=None, max_entries=20):
+        self.directory = directory or os.path.join(
+            os.environ.get('TIKTOKDATA_STORE_DIR', '.data_store'), 'reports'
+        )
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key, extension='xlsx'):
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key, extension='xlsx'):
+        """Path laporan tersimpan, None jika belum ada"""
+        path = self.path_for(key, extension)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def put(self, key, fileobj, extension='xlsx'):
+        """Menyalin isi ``fileobj`` ke cache dan mengembalikan path-nya"""
+        path = self.path_for(key, extension)
+        tmp_path = f"{path}.tmp"
+        fileobj.seek(0)
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp_path, path)
+        self._prune()
+        return path
+
+    def _prune(self):
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if not name.endswith('.tmp')
+        ]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,203 +1,299 @@
 import io
+import json
+import re
+import tempfile
+import zipfile
+import numpy as np
 import pandas as pd
 import xlsxwriter
+from datetime import date, datetime
+from aggregates import DatasetAggregates
+from instrumentation import span
+
+# Di atas jumlah baris tabel ini laporan ditulis dengan mode constant_memory
+STREAMING_ROW_THRESHOLD = 100_000
+
+# Format ekspor: ekstensi file -> (nama metode, tipe MIME)
+EXPORT_FORMATS = {
+    'xlsx': ('create_excel_report', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv.zip': ('create_csv_zip', 'application/zip'),
+    'parquet.zip': ('create_parquet_zip', 'application/zip'),
+    'json': ('create_json_summary', 'application/json'),
+}
+
+def _sheet_file_name(sheet_name):
+    """'Ringkasan per Produk' -> 'ringkasan_per_produk'"""
+    return re.sub(r'[^0-9a-z]+', '_', sheet_name.lower()).strip('_')
 
 class ReportGenerator:
-    def create_excel_report(self, merged_data, summary_data, cost_data):
-        """Membuat laporan Excel"""
+    def export(self, file_format, merged_data, summary_data, cost_data, aggregates=None):
+        """Membuat laporan dalam format dari EXPORT_FORMATS"""
+        method_name, _ = EXPORT_FORMATS[file_format]
+        with span(f'report.{file_format}', rows_in=len(merged_data)) as stage:
+            report = getattr(self, method_name)(merged_data, summary_data, cost_data, aggregates=aggregates)
+            # Objek file yang dikembalikan sudah di-seek ke awal; ukur lalu kembalikan posisinya
+            size = report.seek(0, io.SEEK_END)
+            report.seek(0)
+            stage.attrs['report_mb'] = round(size / 1024 ** 2, 2)
+        return report
+    
+    def create_csv_zip(self, merged_data, summary_data, cost_data, aggregates=None):
+        """Tabel laporan yang sama dengan Excel sebagai CSV per lembar dalam satu zip"""
+        if aggregates is None:
+            aggregates = DatasetAggregates(merged_data).with_costs(summary_data, cost_data)
+        
         output = io.BytesIO()
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('ringkasan.csv', self._overview_frame(aggregates).to_csv(index=False))
+            for sheet_name, df in self._report_sheets(summary_data, cost_data, aggregates).items():
+                archive.writestr(f"{_sheet_file_name(sheet_name)}.csv", df.to_csv(index=False))
+        output.seek(0)
+        return output
+    
+    def create_parquet_zip(self, merged_data, summary_data, cost_data, aggregates=None):
+        """Tabel laporan sebagai file Parquet per lembar dalam satu zip"""
+        if aggregates is None:
+            aggregates = DatasetAggregates(merged_data).with_costs(summary_data, cost_data)
         
-        # Hitung total
-        unique_orders = merged_data.drop_duplicates(subset=['Order ID'])
-        total_orders = unique_orders['Order ID'].nunique()
-        total_revenue = unique_orders['Total settlement amount'].sum()
-        total_qty = merged_data['Quantity'].sum()
-        
-        # Ringkasan berdasarkan SKU
-        summary_by_sku = (
-            merged_data.groupby('Seller SKU', as_index=False)
-            .agg({
-                'Quantity': 'sum',
-                'Order ID': 'nunique',
-                'Total settlement amount': 'sum'
-            })
-            .rename(columns={
-                'Quantity': 'Total Quantity',
-                'Order ID': 'Total Orders',
-                'Total settlement amount': 'Total Revenue'
-            })
-        )
-        
-        # Dapatkan nama produk pertama untuk setiap SKU
-        sku_products = merged_data.groupby('Seller SKU')['Product Name'].first().to_dict()
-        summary_by_sku['Cost per Unit'] = summary_by_sku['Seller SKU'].map(
-            lambda sku: self.get_product_cost(sku_products.get(sku, ''), cost_data)
-        )
-        summary_by_sku['Total Cost'] = summary_by_sku['Total Quantity'] * summary_by_sku['Cost per Unit']
-        summary_by_sku['Profit'] = summary_by_sku['Total Revenue'] - summary_by_sku['Total Cost']
-        summary_by_sku['Profit Margin %'] = (summary_by_sku['Profit'] / summary_by_sku['Total Revenue'] * 100).round(2)
-        summary_by_sku['Share 60%'] = summary_by_sku['Profit'] * 0.6
-        summary_by_sku['Share 40%'] = summary_by_sku['Profit'] * 0.4
+        output = io.BytesIO()
+        # File Parquet sudah terkompresi, jadi zip cukup menyimpan
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+            sheets = {'Ringkasan': self._overview_frame(aggregates)}
+            sheets.update(self._report_sheets(summary_data, cost_data, aggregates))
+            for sheet_name, df in sheets.items():
+                buffer = io.BytesIO()
+                df.to_parquet(buffer, index=False, compression='zstd')
+                archive.writestr(f"{_sheet_file_name(sheet_name)}.parquet", buffer.getvalue())
+        output.seek(0)
+        return output
+    
+    def create_json_summary(self, merged_data, summary_data, cost_data, aggregates=None):
+        """Ringkasan JSON: metrik kunci, periode dan produk teratas"""
+        if aggregates is None:
+            aggregates = DatasetAggregates(merged_data).with_costs(summary_data, cost_data)
         
-        # Hitung total biaya dan profit
-        total_cost = summary_by_sku['Total Cost'].sum()
+        date_range_start, date_range_end = aggregates.date_range
+        top_products = summary_data.nlargest(10, 'Profit')
+        payload = {
+            'period': {
+                'start': date_range_start.strftime('%Y-%m-%d'),
+                'end': date_range_end.strftime('%Y-%m-%d'),
+            },
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'metrics': self._overview_metrics(aggregates),
+            'top_products': json.loads(top_products.to_json(orient='records', force_ascii=False)),
+        }
+        return io.BytesIO(json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'))
+    
+    def _overview_frame(self, aggregates):
+        metrics = self._overview_metrics(aggregates)
+        return pd.DataFrame({'Metric': list(metrics), 'Value': [float(v) for v in metrics.values()]})
+    
+    def _overview_metrics(self, aggregates):
+        """Metrik lembar Ringkasan sebagai dict"""
+        total_orders = int(aggregates.total_orders)
+        total_revenue = float(aggregates.total_revenue)
+        total_cost = float(aggregates.sku_total_cost)
         total_profit = total_revenue - total_cost
-        total_share_60 = total_profit * 0.6
-        total_share_40 = total_profit * 0.4
+        return {
+            'Total Pesanan': total_orders,
+            'Total Kuantitas': int(aggregates.total_qty),
+            'Total Pendapatan': total_revenue,
+            'Total Biaya': total_cost,
+            'Total Profit': total_profit,
+            'Bagian 60%': total_profit * 0.6,
+            'Bagian 40%': total_profit * 0.4,
+            'Nilai Rata-rata Pesanan': total_revenue / total_orders if total_orders > 0 else 0,
+            'Rata-rata Profit per Pesanan': total_profit / total_orders if total_orders > 0 else 0,
+            'Margin Profit Keseluruhan %': (total_profit / total_revenue * 100) if total_revenue > 0 else 0,
+        }
+    
+    def create_excel_report(self, merged_data, summary_data, cost_data, aggregates=None, streaming=None):
+        """Membuat laporan Excel.
+
+        Dengan ``streaming=True`` (otomatis untuk tabel besar) workbook ditulis
+        baris demi baris memakai mode ``constant_memory`` xlsxwriter ke file
+        sementara di disk, bukan ke memori. Mengembalikan objek file yang
+        sudah di-seek ke awal.
+        """
+        # Agregat bersama; hitung sekali jika belum tersedia dari DataManager
+        if aggregates is None:
+            aggregates = DatasetAggregates(merged_data).with_costs(summary_data, cost_data)
         
-        # Analisis penjualan harian
-        date_column = None
-        possible_date_columns = [
-            'Order created time(UTC)', 'Order creation time', 'Order Creation Time', 
-            'Creation Time', 'Date', 'Order Date', 'Order created time', 'Created time'
-        ]
-        
-        for col in possible_date_columns:
-            if col in merged_data.columns:
-                date_column = col
-                break
-        
-        if date_column:
-            try:
-                merged_data_copy = merged_data.copy()
-                merged_data_copy['Order Date'] = pd.to_datetime(merged_data_copy[date_column]).dt.date
-                daily_sales = (
-                    merged_data_copy.groupby('Order Date', as_index=False)
-                    .agg({
-                        'Quantity': 'sum',
-                        'Order ID': 'nunique',
-                        'Total settlement amount': 'sum'
-                    })
-                    .rename(columns={
-                        'Quantity': 'Daily Quantity',
-                        'Order ID': 'Daily Orders',
-                        'Total settlement amount': 'Daily Revenue'
-                    })
-                )
-            except:
-                daily_sales = pd.DataFrame({
-                    'Order Date': ['Data tidak tersedia'],
-                    'Daily Quantity': [0],
-                    'Daily Orders': [0],
-                    'Daily Revenue': [0]
-                })
-        else:
-            daily_sales = pd.DataFrame({
-                'Order Date': ['Kolom tanggal tidak ditemukan'],
-                'Daily Quantity': [0],
-                'Daily Orders': [0],
-                'Daily Revenue': [0]
-            })
+        sheets = self._report_sheets(summary_data, cost_data, aggregates)
+        if streaming is None:
+            streaming = sum(len(df) for df in sheets.values()) > STREAMING_ROW_THRESHOLD
         
-        # Produk terbaik berdasarkan profit
-        top_products = summary_data.nlargest(10, 'Profit')
+        if streaming:
+            return self._write_streaming(aggregates, sheets)
+        
+        output = io.BytesIO()
         
         # Buat penulis Excel
         with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            
-            # Tentukan format
-            title_format = workbook.add_format({
-                'bold': True, 'font_size': 16, 'align': 'center',
-                'bg_color': '#4472C4', 'font_color': 'white'
-            })
-            
-            header_format = workbook.add_format({
-                'bold': True, 'font_size': 12,
-                'bg_color': '#D9E2F3', 'border': 1
-            })
-            
-            currency_format = workbook.add_format({
-                'num_format': '#,##0', 'border': 1
-            })
-            
-            number_format = workbook.add_format({
-                'num_format': '#,##0', 'border': 1
-            })
-            
-            percent_format = workbook.add_format({
-                'num_format': '0.00%', 'border': 1
-            })
-            
-            # Lembar ringkasan
-            overview_sheet = workbook.add_worksheet('Ringkasan')
-            overview_sheet.set_column('A:B', 25)
-            overview_sheet.set_column('C:C', 20)
-            
-            row = 0
-            overview_sheet.merge_range(f'A{row+1}:C{row+1}', 'LAPORAN PENJUALAN & ANALISIS PROFIT', title_format)
-            row += 2
-            
-            # Rentang tanggal
-            if date_column and date_column in merged_data.columns:
-                try:
-                    date_range_start = pd.to_datetime(merged_data[date_column]).min()
-                    date_range_end = pd.to_datetime(merged_data[date_column]).max()
-                except:
-                    date_range_start = datetime.now()
-                    date_range_end = datetime.now()
-            else:
-                date_range_start = datetime.now()
-                date_range_end = datetime.now()
-            
-            overview_sheet.write(row, 0, f'Periode:', header_format)
-            overview_sheet.write(row, 1, f'{date_range_start.strftime("%d/%m/%Y")} - {date_range_end.strftime("%d/%m/%Y")}')
-            row += 1
-            
-            overview_sheet.write(row, 0, f'Dibuat:', header_format)
-            overview_sheet.write(row, 1, f'{datetime.now().strftime("%d %B %Y %H:%M")}')
-            row += 3
-            
-            # Metrik kunci
-            overview_sheet.write(row, 0, 'RINGKASAN PENJUALAN & PROFIT', header_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Pesanan:')
-            overview_sheet.write(row, 1, total_orders, number_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Kuantitas:')
-            overview_sheet.write(row, 1, total_qty, number_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Pendapatan:')
-            overview_sheet.write(row, 1, total_revenue, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Biaya:')
-            overview_sheet.write(row, 1, total_cost, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Profit:')
-            overview_sheet.write(row, 1, total_profit, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Bagian 60%:')
-            overview_sheet.write(row, 1, total_share_60, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Bagian 40%:')
-            overview_sheet.write(row, 1, total_share_40, currency_format)
-            row += 2
-            
-            # Hitung metrik tambahan
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-            avg_profit_per_order = total_profit / total_orders if total_orders > 0 else 0
-            overall_profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-            
-            overview_sheet.write(row, 0, 'Nilai Rata-rata Pesanan:')
-            overview_sheet.write(row, 1, avg_order_value, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Rata-rata Profit per Pesanan:')
-            overview_sheet.write(row, 1, avg_profit_per_order, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Margin Profit Keseluruhan:')
-            overview_sheet.write(row, 1, overall_profit_margin / 100, percent_format)
+            self._write_overview(writer.book, aggregates)
             
             # Tulis lembar lainnya
-            summary_data.to_excel(writer, index=False, sheet_name='Ringkasan per Produk')
-            summary_by_sku.to_excel(writer, index=False, sheet_name='Ringkasan per SKU')
-            daily_sales.to_excel(writer, index=False, sheet_name='Penjualan Harian')
-            top_products.to_excel(writer, index=False, sheet_name='Produk Teratas')
+            for sheet_name, df in sheets.items():
+                df.to_excel(writer, index=False, sheet_name=sheet_name)
+        
+        output.seek(0)
+        return output
+    
+    def _report_sheets(self, summary_data, cost_data, aggregates):
+        """Tabel untuk lembar-lembar setelah Ringkasan, sesuai urutan di workbook"""
+        sheets = {
+            'Ringkasan per Produk': summary_data,
+            'Ringkasan per SKU': aggregates.summary_by_sku,
+            'Penjualan Harian': aggregates.daily_sales,
+        }
+        
+        # Penjualan bulanan dari rollup deret waktu
+        if aggregates.time_series is not None:
+            monthly_sales = aggregates.time_series.rollup('month').rename(columns={
+                'Quantity': 'Monthly Quantity',
+                'Orders': 'Monthly Orders',
+                'Revenue': 'Monthly Revenue'
+            })
+            monthly_sales.insert(0, 'Month', monthly_sales.pop('Period').dt.strftime('%Y-%m'))
+            sheets['Penjualan Bulanan'] = monthly_sales
+        
+        # Produk terbaik berdasarkan profit
+        sheets['Produk Teratas'] = summary_data.nlargest(10, 'Profit')
+        
+        # Daftar biaya produk
+        if cost_data:
+            cost_df = pd.DataFrame(list(cost_data.items()), columns=["Product Name", "Cost per Unit"])
+            sheets['Daftar Biaya Produk'] = cost_df.sort_values(by="Product Name")
+        
+        return sheets
+    
+    def _write_overview(self, workbook, aggregates):
+        """Lembar Ringkasan berisi metrik kunci; baris ditulis berurutan"""
+        # Hitung total
+        total_orders = aggregates.total_orders
+        total_revenue = aggregates.total_revenue
+        total_qty = aggregates.total_qty
+        
+        # Hitung total biaya dan profit
+        total_cost = aggregates.sku_total_cost
+        total_profit = total_revenue - total_cost
+        total_share_60 = total_profit * 0.6
+        total_share_40 = total_profit * 0.4
+        
+        # Tentukan format
+        title_format = workbook.add_format({
+            'bold': True, 'font_size': 16, 'align': 'center',
+            'bg_color': '#4472C4', 'font_color': 'white'
+        })
+        
+        header_format = workbook.add_format({
+            'bold': True, 'font_size': 12,
+            'bg_color': '#D9E2F3', 'border': 1
+        })
+        
+        currency_format = workbook.add_format({
+            'num_format': '#,##0', 'border': 1
+        })
+        
+        number_format = workbook.add_format({
+            'num_format': '#,##0', 'border': 1
+        })
+        
+        percent_format = workbook.add_format({
+            'num_format': '0.00%', 'border': 1
+        })
+        
+        # Lembar ringkasan
+        overview_sheet = workbook.add_worksheet('Ringkasan')
+        overview_sheet.set_column('A:B', 25)
+        overview_sheet.set_column('C:C', 20)
+        
+        row = 0
+        overview_sheet.merge_range(f'A{row+1}:C{row+1}', 'LAPORAN PENJUALAN & ANALISIS PROFIT', title_format)
+        row += 2
+        
+        # Rentang tanggal
+        date_range_start, date_range_end = aggregates.date_range
+        
+        overview_sheet.write(row, 0, f'Periode:', header_format)
+        overview_sheet.write(row, 1, f'{date_range_start.strftime("%d/%m/%Y")} - {date_range_end.strftime("%d/%m/%Y")}')
+        row += 1
+        
+        overview_sheet.write(row, 0, f'Dibuat:', header_format)
+        overview_sheet.write(row, 1, f'{datetime.now().strftime("%d %B %Y %H:%M")}')
+        row += 3
+        
+        # Metrik kunci
+        overview_sheet.write(row, 0, 'RINGKASAN PENJUALAN & PROFIT', header_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Total Pesanan:')
+        overview_sheet.write(row, 1, total_orders, number_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Total Kuantitas:')
+        overview_sheet.write(row, 1, total_qty, number_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Total Pendapatan:')
+        overview_sheet.write(row, 1, total_revenue, currency_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Total Biaya:')
+        overview_sheet.write(row, 1, total_cost, currency_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Total Profit:')
+        overview_sheet.write(row, 1, total_profit, currency_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Bagian 60%:')
+        overview_sheet.write(row, 1, total_share_60, currency_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Bagian 40%:')
+        overview_sheet.write(row, 1, total_share_40, currency_format)
+        row += 2
+        
+        # Hitung metrik tambahan
+        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+        avg_profit_per_order = total_profit / total_orders if total_orders > 0 else 0
+        overall_profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
+        
+        overview_sheet.write(row, 0, 'Nilai Rata-rata Pesanan:')
+        overview_sheet.write(row, 1, avg_order_value, currency_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Rata-rata Profit per Pesanan:')
+        overview_sheet.write(row, 1, avg_profit_per_order, currency_format)
+        row += 1
+        overview_sheet.write(row, 0, 'Margin Profit Keseluruhan:')
+        overview_sheet.write(row, 1, overall_profit_margin / 100, percent_format)
+    
+    def _write_streaming(self, aggregates, sheets):
+        """Menulis workbook dengan constant_memory ke file sementara"""
+        output = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        
+        self._write_overview(workbook, aggregates)
+        
+        # Format header dan tanggal sama dengan DataFrame.to_excel
+        header_format = workbook.add_format({
+            'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'
+        })
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        datetime_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        
+        for sheet_name, df in sheets.items():
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
             
-            # Daftar biaya produk
-            if cost_data:
-                cost_df = pd.DataFrame(list(cost_data.items()), columns=["Product Name", "Cost per Unit"])
-                cost_df = cost_df.sort_values(by="Product Name")
-                cost_df.to_excel(writer, index=False, sheet_name='Daftar Biaya Produk')
+            for row_number, values in enumerate(df.itertuples(index=False, name=None), start=1):
+                for col_number, value in enumerate(values):
+                    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+                        continue
+                    if isinstance(value, datetime):
+                        worksheet.write_datetime(row_number, col_number, value, datetime_format)
+                    elif isinstance(value, date):
+                        worksheet.write_datetime(row_number, col_number, value, date_format)
+                    elif isinstance(value, np.generic):
+                        worksheet.write(row_number, col_number, value.item())
+                    else:
+                        worksheet.write(row_number, col_number, value)
         
+        workbook.close()
         output.seek(0)
-        return output
\ No newline at end of file
+        return output
@@ -0,0 +1,154 @@
+# settlement_index.py
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from columns import DATE_COLUMNS
+
+ID_COLUMN = 'Order/adjustment ID'
+AMOUNT_COLUMN = 'Total settlement amount'
+LINES_COLUMN = 'Settlement Lines'
+# Dinaikkan setiap kali isi indeks berubah agar file lama di disk tidak terpakai
+INDEX_FORMAT = 2
+
+
+def _order_ids(series):
+    """ID pesanan sebagai teks agar kedua sisi rekonsiliasi bertipe sama"""
+    return series.astype('string').str.strip()
+
+
+class Reconciliation:
+    """Hasil pencocokan pesanan dengan settlement"""
+
+    def __init__(self, merged, unmatched_orders, unmatched_settlements):
+        # Baris pesanan yang memiliki settlement, dengan kolom settlement ditambahkan
+        self.merged = merged
+        # Order ID pesanan yang belum memiliki settlement
+        self.unmatched_orders = unmatched_orders
+        # Order/adjustment ID settlement yang tidak memiliki pesanan (total per ID)
+        self.unmatched_settlements = unmatched_settlements
+
+
+class SettlementIndex:
+    """Indeks Order/adjustment ID -> total settlement.
+
+    Semua baris settlement dan penyesuaian untuk ID yang sama dijumlahkan
+    sekali saat indeks dibangun, sehingga tidak ada baris yang terbuang
+    seperti pada ``drop_duplicates``. Rekonsiliasi berikutnya cukup
+    mencari posisi Order ID di indeks hash tanpa merge ulang.
+
+    Tanggal pertama per ID dari kolom tanggal settlement (jika ada) ikut
+    disimpan, karena ekspor pesanan sering tidak memiliki kolom tanggal.
+    """
+
+    def __init__(self, settlements):
+        # DataFrame ber-index Order/adjustment ID dengan kolom total dan jumlah baris
+        self.settlements = settlements
+
+    @classmethod
+    def from_income(cls, income_data):
+        ids = _order_ids(income_data[ID_COLUMN])
+        amounts = pd.to_numeric(income_data[AMOUNT_COLUMN], errors='coerce')
+        frame = pd.DataFrame({ID_COLUMN: ids, AMOUNT_COLUMN: amounts})
+        aggregations = {AMOUNT_COLUMN: (AMOUNT_COLUMN, 'sum'), LINES_COLUMN: (AMOUNT_COLUMN, 'size')}
+
+        date_column = next((col for col in DATE_COLUMNS if col in income_data.columns), None)
+        if date_column:
+            dates = income_data[date_column]
+            # Nilai campuran dari Excel disimpan sebagai teks agar bisa ditulis ke Arrow
+            frame[date_column] = dates.to_numpy() if dates.dtype.kind == 'M' else dates.astype('string').to_numpy()
+            aggregations[date_column] = (date_column, 'first')
+
+        settlements = (
+            frame
+            .dropna(subset=[ID_COLUMN])
+            .groupby(ID_COLUMN, sort=False)
+            .agg(**aggregations)
+        )
+        return cls(settlements)
+
+    def __len__(self):
+        return len(self.settlements)
+
+    def reconcile(self, orders):
+        """Mencocokkan baris pesanan dengan indeks lewat Order ID"""
+        order_ids = _order_ids(orders['Order ID'])
+        positions = self.settlements.index.get_indexer(order_ids)
+        matched = positions >= 0
+
+        merged = orders[matched].copy()
+        columns = [AMOUNT_COLUMN, LINES_COLUMN]
+        if not any(col in orders.columns for col in DATE_COLUMNS):
+            # Tanggal settlement dipakai hanya jika pesanan tidak membawa tanggal sendiri
+            columns += [col for col in DATE_COLUMNS if col in self.settlements.columns]
+        for col in columns:
+            merged[col] = self.settlements[col].to_numpy()[positions[matched]]
+
+        unmatched_orders = order_ids[~matched].dropna().unique().tolist()
+        # Posisi dari get_indexer sudah menandai settlement yang terpakai
+        settled = np.zeros(len(self.settlements), dtype=bool)
+        settled[positions[matched]] = True
+        unmatched_settlements = self.settlements[~settled]
+        return Reconciliation(merged, unmatched_orders, unmatched_settlements)
+
+    # --- penyimpanan ---
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(self.settlements.reset_index(), tmp_path, compression='lz4')
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Membaca indeks tersimpan, None jika belum ada"""
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        os.utime(path)
+        return cls(table.to_pandas().set_index(ID_COLUMN))
+
+
+class SettlementIndexStore:
+    """Indeks settlement tersimpan di disk, satu file per isi data pendapatan"""
+
+    def __init__(self, directory=None, max_files=20):
+        self.directory = directory or os.path.join(
+            os.environ.get('TIKTOKDATA_STORE_DIR', '.data_store'), 'settlement_index'
+        )
+        self.max_files = max_files
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        digest = hashlib.sha256(repr((INDEX_FORMAT, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.arrow")
+
+    def get_or_build(self, income_data, key):
+        """Memuat indeks untuk ``key`` (sidik jari data pendapatan) atau membangunnya"""
+        path = self.path_for(key)
+        index = SettlementIndex.load(path)
+        if index is None:
+            index = SettlementIndex.from_income(income_data)
+            index.save(path)
+            self._prune()
+        return index
+
+    def _prune(self):
+        """Menghapus indeks yang paling lama tidak dipakai jika melebihi max_files"""
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith('.arrow')
+        ]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,114 @@
+# synthetic_data.py
+
+import io
+
+import numpy as np
+import pandas as pd
+
+# Format tanggal seperti pada ekspor TikTok Shop
+EXPORT_DATE_FORMAT = '%d/%m/%Y %H:%M:%S'
+
+PESANAN_STATUSES = ['Selesai', 'Dibatalkan', 'Dikirim', 'Belum dibayar']
+PROVINCES = ['DKI Jakarta', 'Jawa Barat', 'Jawa Tengah', 'Jawa Timur', 'Banten', 'Bali', 'Sumatera Utara']
+VARIATIONS = ['Hitam', 'Putih', 'Merah', 'Biru', 'Hitam, XL', 'Putih, L', 'Default']
+
+
+def generate_exports(rows=10_000, skus=200, adjustment_rate=0.05, completed_rate=0.8,
+                     start='2024-01-01', days=90, seed=0, pesanan_dates=True):
+    """Membuat pasangan ekspor pesanan dan pendapatan sintetis.
+
+    ``rows`` adalah jumlah baris pesanan (satu baris per item; satu pesanan
+    berisi 1-3 item), ``skus`` jumlah Seller SKU berbeda dan
+    ``adjustment_rate`` proporsi pesanan selesai yang mendapat baris
+    penyesuaian tambahan di data pendapatan. Tanggal pesanan selalu ada di
+    data pendapatan (``Order created time(UTC)``); dengan
+    ``pesanan_dates=False`` ekspor pesanan tidak memiliki kolom tanggal,
+    seperti ekspor TikTok Shop yang sebenarnya. Mengembalikan
+    ``(pesanan, income)`` dengan nama kolom seperti ekspor aslinya.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Pesanan dan item per pesanan
+    items_per_order = rng.choice([1, 2, 3], size=rows, p=[0.7, 0.2, 0.1])
+    order_numbers = np.repeat(np.arange(rows), items_per_order)[:rows]
+    n_orders = int(order_numbers[-1]) + 1 if rows else 0
+    order_ids = (576_000_000_000_000_000 + np.arange(n_orders) * 7919).astype(str)
+
+    order_status = rng.choice(
+        PESANAN_STATUSES, size=n_orders,
+        p=[completed_rate] + [(1 - completed_rate) / 3] * 3
+    )
+    order_times = pd.Timestamp(start) + pd.to_timedelta(
+        np.sort(rng.uniform(0, days * 86_400, size=n_orders)), unit='s'
+    ).floor('s')
+
+    # Popularitas SKU mengikuti distribusi Zipf agar ada produk laris dan ekor panjang
+    sku_weights = 1 / np.arange(1, skus + 1) ** 1.1
+    sku_numbers = rng.choice(skus, size=rows, p=sku_weights / sku_weights.sum())
+    sku_prices = np.round(rng.lognormal(11, 0.6, size=skus), -2)
+    product_numbers = sku_numbers // 3  # beberapa SKU (variasi) per produk
+    quantities = rng.choice([1, 2, 3, 4, 5], size=rows, p=[0.6, 0.2, 0.1, 0.06, 0.04])
+
+    pesanan = pd.DataFrame({
+        'Order ID': order_ids[order_numbers],
+        'Order Status': order_status[order_numbers],
+        'Seller SKU': np.char.add('SKU-', sku_numbers.astype(str)),
+        'Product Name': np.char.add('Produk Sintetis ', product_numbers.astype(str)),
+        'Variation': rng.choice(VARIATIONS, size=rows),
+        'Quantity': quantities,
+        'SKU Unit Original Price': sku_prices[sku_numbers],
+        'Order created time': order_times[order_numbers].strftime(EXPORT_DATE_FORMAT),
+        'Province': rng.choice(PROVINCES, size=rows),
+    })
+    if not pesanan_dates:
+        pesanan = pesanan.drop(columns='Order created time')
+
+    # Settlement: satu baris per pesanan selesai, total harga item dikurangi biaya platform
+    completed = pesanan[pesanan['Order Status'] == 'Selesai']
+    order_totals = (completed['Quantity'] * completed['SKU Unit Original Price']).groupby(completed['Order ID'], sort=False).sum()
+    fees = rng.uniform(0.05, 0.15, size=len(order_totals))
+    settlement_ids = order_totals.index.to_numpy()
+    income = pd.DataFrame({
+        'Order/adjustment ID': settlement_ids,
+        'Type': 'Order',
+        'Total settlement amount': np.round(order_totals.to_numpy() * (1 - fees)),
+    })
+
+    # Penyesuaian tambahan (ongkir, retur sebagian, kompensasi) untuk sebagian pesanan
+    n_adjustments = int(len(settlement_ids) * adjustment_rate)
+    if n_adjustments:
+        adjusted = rng.choice(settlement_ids, size=n_adjustments, replace=False)
+        adjustments = pd.DataFrame({
+            'Order/adjustment ID': adjusted,
+            'Type': 'Adjustment',
+            'Total settlement amount': np.round(rng.normal(-5_000, 10_000, size=n_adjustments), -2),
+        })
+        income = pd.concat([income, adjustments], ignore_index=True)
+
+    created = pd.Series(order_times.strftime(EXPORT_DATE_FORMAT), index=order_ids)
+    income['Order created time(UTC)'] = created.reindex(income['Order/adjustment ID']).to_numpy()
+    income = income.sample(frac=1, random_state=seed).reset_index(drop=True)
+    return pesanan, income
+
+
+def to_excel_bytes(df, kind):
+    """Menulis DataFrame sebagai file Excel seperti ekspor TikTok Shop.
+
+    Ekspor pesanan memiliki baris keterangan kolom di bawah header, yang
+    dilewati oleh ``read_pesanan_excel``.
+    """
+    if kind == 'pesanan':
+        description = pd.DataFrame([[f"Keterangan {col}" for col in df.columns]], columns=df.columns)
+        df = pd.concat([description, df.astype(object)], ignore_index=True)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False)
+    return output.getvalue()
+
+
+def generate_cost_data(pesanan, coverage=0.9, seed=0):
+    """Tabel biaya per produk untuk sebagian besar produk pada ekspor sintetis"""
+    rng = np.random.default_rng(seed)
+    products = pesanan['Product Name'].drop_duplicates().to_numpy()
+    products = products[rng.random(len(products)) < coverage]
+    return {name: float(np.round(rng.uniform(5_000, 60_000), -2)) for name in products}
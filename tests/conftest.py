@@ -0,0 +1,9 @@
+# Modul aplikasi berada di root repositori, bukan paket
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Metrik dan cache yang ditulis modul aplikasi tidak masuk ke direktori kerja
+os.environ.setdefault('TIKTOKDATA_STORE_DIR', tempfile.mkdtemp(prefix='tiktokdata-tests-'))
@@ -0,0 +1,45 @@
+from cost_cache import CostCache
+from cost_store import JsonCostStore, SqliteCostStore
+
+
+class DictRemote:
+    """Sumber biaya jarak jauh di memori"""
+
+    def __init__(self, costs):
+        self.costs = dict(costs)
+
+    def load_cost_data(self):
+        return dict(self.costs)
+
+    def save_cost_data(self, cost_dict):
+        self.costs = dict(cost_dict)
+
+
+def test_set_cost_keeps_products_pulled_later(tmp_path):
+    remote = DictRemote({"A": 1.0})
+    cache = CostCache(lambda: remote, path=str(tmp_path / "cache.sqlite"), ttl_seconds=3600)
+    session_costs = cache.load_cost_data()
+
+    # Produk baru masuk lewat sinkronisasi setelah sesi memuat biayanya
+    remote.costs["B"] = 2.0
+    cache.request_revalidation()
+    cache.sync()
+    assert "B" not in session_costs
+
+    cache.set_cost("A", 5.0)
+    cache.sync()
+    assert cache.load_cost_data() == {"A": 5.0, "B": 2.0}
+    assert remote.costs == {"A": 5.0, "B": 2.0}
+
+    cache.delete_cost("A")
+    cache.sync()
+    assert remote.costs == {"B": 2.0}
+
+
+def test_local_stores_set_and_delete_one_product(tmp_path):
+    for store in (JsonCostStore(str(tmp_path / "costs.json")), SqliteCostStore(str(tmp_path / "costs.sqlite"))):
+        store.save_cost_data({"A": 1.0, "B": 2.0})
+        store.set_cost("C", 3.0)
+        store.delete_cost("A")
+        store.delete_cost("missing")
+        assert store.load_cost_data() == {"B": 2.0, "C": 3.0}
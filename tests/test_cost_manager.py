@@ -0,0 +1,69 @@
+import random
+
+from cost_manager import CostManager, LocalWorksheet
+
+
+def sheet_costs(worksheet):
+    """Isi worksheet sebagai dict nama -> biaya (baris tanpa nama dilewati)"""
+    values = worksheet.get_all_values()
+    assert values[0] == CostManager.HEADER
+    return {row[0]: float(row[1]) for row in values[1:] if row and row[0]}
+
+
+def make_manager(rows=None):
+    values = [CostManager.HEADER] + [list(row) for row in rows] if rows is not None else []
+    worksheet = LocalWorksheet(values)
+    return CostManager(worksheet=worksheet), worksheet
+
+
+def test_upsert_writes_only_changed_cells():
+    manager, worksheet = make_manager([["A", 1], ["B", 2]])
+    assert manager.load_cost_data() == {"A": 1.0, "B": 2.0}
+
+    manager.save_cost_data({"A": 1, "B": 5, "C": 3})
+
+    assert sheet_costs(worksheet) == {"A": 1.0, "B": 5.0, "C": 3.0}
+    assert worksheet.requests[-1] == [
+        {"range": "B3", "values": [[5.0]]},
+        {"range": "A4:B4", "values": [["C", 3.0]]},
+    ]
+
+
+def test_delete_moves_last_row_into_the_gap():
+    manager, worksheet = make_manager([["A", 1], ["B", 2], ["C", 3]])
+    manager.load_cost_data()
+
+    manager.save_cost_data({"B": 2, "C": 3})
+
+    assert worksheet.get_all_values() == [CostManager.HEADER, ["C", 3.0], ["B", 2]]
+    assert worksheet.requests[-1] == [
+        {"range": "A2:B2", "values": [["C", 3.0]]},
+        {"range": "A4:B4", "values": [["", ""]]},
+    ]
+
+
+def test_empty_sheet_gets_header():
+    manager, worksheet = make_manager()
+    assert manager.load_cost_data() == {}
+
+    manager.save_cost_data({"A": 1})
+
+    assert worksheet.get_all_values() == [CostManager.HEADER, ["A", 1.0]]
+
+
+def test_random_edits_match_saved_costs():
+    rng = random.Random(0)
+    manager, worksheet = make_manager([[f"P{i}", i] for i in range(20)])
+    costs = manager.load_cost_data()
+
+    for _ in range(200):
+        costs = dict(costs)
+        for name in rng.sample(sorted(costs), k=min(len(costs), rng.randint(0, 3))):
+            del costs[name]
+        for _ in range(rng.randint(0, 3)):
+            costs[f"P{rng.randint(0, 40)}"] = float(rng.randint(0, 100))
+        manager.save_cost_data(costs)
+        assert sheet_costs(worksheet) == costs
+
+    # Pembaca baru melihat isi yang sama
+    assert CostManager(worksheet=worksheet).load_cost_data() == costs
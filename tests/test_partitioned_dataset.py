@@ -0,0 +1,79 @@
+import pandas as pd
+
+from data_manager import DataManager
+from partitioned_dataset import UNKNOWN_MONTH, PartitionedDataset
+from synthetic_data import generate_exports
+
+
+def make_exports():
+    # Tiga bulan pesanan tanpa kolom tanggal, seperti ekspor TikTok Shop
+    pesanan, income = generate_exports(rows=600, skus=20, start='2024-01-01', days=90, pesanan_dates=False)
+    months = pd.to_datetime(income['Order created time(UTC)'], format='%d/%m/%Y %H:%M:%S').dt.strftime('%Y-%m')
+    return pesanan, income, months
+
+
+def count_merges(manager):
+    """Mencatat jumlah baris pesanan setiap kali satu partisi diproses ulang"""
+    calls = []
+    merge_and_group = manager._merge_and_group
+
+    def counting(df1, *args, **kwargs):
+        calls.append(len(df1))
+        return merge_and_group(df1, *args, **kwargs)
+
+    manager._merge_and_group = counting
+    return calls
+
+
+def test_dateless_pesanan_moves_to_income_months(tmp_path):
+    pesanan, income, months = make_exports()
+    dataset = PartitionedDataset(str(tmp_path))
+
+    assert dataset.append_pesanan(pesanan) == [UNKNOWN_MONTH]
+    assert dataset.append_income(income[months == '2024-01']) == ['2024-01', UNKNOWN_MONTH]
+    assert dataset.months() == ['2024-01', UNKNOWN_MONTH]
+
+    # Semua pesanan selesai kini memiliki pendapatan: partisi unknown dihapus
+    assert dataset.append_income(income[months != '2024-01']) == ['2024-02', '2024-03']
+    assert dataset.months() == ['2024-01', '2024-02', '2024-03']
+    assert (dataset.order_index()['month'] != UNKNOWN_MONTH).all()
+
+
+def test_income_before_pesanan_sets_month(tmp_path):
+    pesanan, income, _ = make_exports()
+    dataset = PartitionedDataset(str(tmp_path))
+
+    assert dataset.append_income(income) == []
+    assert dataset.append_pesanan(pesanan) == ['2024-01', '2024-02', '2024-03']
+
+
+def test_only_affected_months_are_recomputed(tmp_path):
+    pesanan, income, months = make_exports()
+    dataset = PartitionedDataset(str(tmp_path))
+    dataset.append_pesanan(pesanan)
+    dataset.append_income(income[months != '2024-03'])
+
+    manager = DataManager()
+    calls = count_merges(manager)
+    manager.process_dataset(dataset, {})
+    assert len(calls) == 3  # 2024-01, 2024-02 dan unknown
+
+    calls.clear()
+    adjustment = income[months == '2024-02'].head(1).assign(**{'Total settlement amount': -1000})
+    assert dataset.append_income(adjustment) == ['2024-02']
+    manager.process_dataset(dataset, {})
+    assert len(calls) == 1
+
+    calls.clear()
+    dataset.append_income(income[months == '2024-03'])
+    merged, summary = manager.process_dataset(dataset, {})
+    # Hanya 2024-03 yang dipindahkan dari unknown yang diproses ulang
+    assert len(calls) == 1
+    assert dataset.months() == ['2024-01', '2024-02', '2024-03']
+
+    # Hasil bertahap sama dengan memproses seluruh data sekaligus
+    full_merged, full_summary = DataManager().process_data(
+        pesanan, pd.concat([income, adjustment], ignore_index=True), {}
+    )
+    assert merged['Order ID'].nunique() == full_merged['Order ID'].nunique()
+    assert summary['Revenue'].sum() == full_summary['Revenue'].sum()
@@ -0,0 +1,71 @@
+import pandas as pd
+
+import settlement_index
+from settlement_index import SettlementIndex, SettlementIndexStore
+
+
+def make_income():
+    return pd.DataFrame({
+        'Order/adjustment ID': ['1001', '1002', '1001', '1001', '9999'],
+        'Total settlement amount': [100.0, 200.0, -20.0, 5.0, 50.0],
+        'Order created time(UTC)': ['05/01/2024 10:00:00', '06/01/2024 11:00:00',
+                                    '05/01/2024 10:00:00', '20/01/2024 09:00:00', '07/01/2024 12:00:00'],
+    })
+
+
+def make_orders(**columns):
+    return pd.DataFrame({
+        'Order ID': [1001, 1002, 1003],
+        'Product Name': ['A', 'B', 'C'],
+        'Quantity': [1, 2, 3],
+        **columns,
+    })
+
+
+def test_adjustment_lines_are_summed_per_order():
+    index = SettlementIndex.from_income(make_income())
+
+    settlements = index.settlements
+    assert len(index) == 3
+    assert settlements.loc['1001', 'Total settlement amount'] == 85.0
+    assert settlements.loc['1001', 'Settlement Lines'] == 3
+    assert settlements.loc['1002', 'Settlement Lines'] == 1
+
+
+def test_unmatched_orders_and_settlements():
+    reconciliation = SettlementIndex.from_income(make_income()).reconcile(make_orders())
+
+    # Order ID numerik dicocokkan dengan ID teks di data pendapatan
+    assert reconciliation.merged['Order ID'].tolist() == [1001, 1002]
+    assert reconciliation.merged['Total settlement amount'].tolist() == [85.0, 200.0]
+    assert reconciliation.unmatched_orders == ['1003']
+    assert reconciliation.unmatched_settlements.index.tolist() == ['9999']
+
+
+def test_settlement_date_fills_dateless_orders():
+    merged = SettlementIndex.from_income(make_income()).reconcile(make_orders()).merged
+
+    # Tanggal baris pertama per ID, bukan tanggal penyesuaian berikutnya
+    assert merged['Order created time(UTC)'].tolist() == ['05/01/2024 10:00:00', '06/01/2024 11:00:00']
+
+
+def test_orders_keep_their_own_dates():
+    orders = make_orders(**{'Order created time': ['01/02/2024 00:00:00'] * 3})
+    merged = SettlementIndex.from_income(make_income()).reconcile(orders).merged
+
+    assert 'Order created time(UTC)' not in merged.columns
+    assert merged['Order created time'].tolist() == ['01/02/2024 00:00:00'] * 2
+
+
+def test_store_reuses_index_until_format_changes(tmp_path, monkeypatch):
+    store = SettlementIndexStore(str(tmp_path))
+    store.get_or_build(make_income(), 'income-v1')
+
+    # Indeks tersimpan dipakai ulang tanpa membaca data pendapatan lagi
+    assert len(store.get_or_build(None, 'income-v1')) == 3
+
+    # Format indeks baru: file lama tidak dipakai dan indeks dibangun ulang
+    monkeypatch.setattr(settlement_index, 'INDEX_FORMAT', settlement_index.INDEX_FORMAT + 1)
+    rebuilt = store.get_or_build(make_income().head(2), 'income-v1')
+    assert len(rebuilt) == 2
+    assert len(list(tmp_path.glob('*.arrow'))) == 2
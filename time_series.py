@@ -0,0 +1,123 @@
+# time_series.py
+
+import warnings
+
+import pandas as pd
+
+# Granularitas rollup -> frekuensi periode pandas (minggu dimulai hari Senin)
+GRANULARITIES = {
+    'day': 'D',
+    'week': 'W-SUN',
+    'month': 'M',
+}
+
+CUBE_KEYS = ['Seller SKU', 'Product Name']
+
+
+def parse_dates(series):
+    """Parsing tanggal secara vektor.
+
+    Kolom kategori hanya mem-parsing kategorinya; kolom teks memakai satu
+    format yang ditebak dari nilai pertama, jauh lebih cepat dari parsing
+    per nilai, dan baru jatuh ke ``format='mixed'`` jika semua tebakan
+    gagal. Tanggal berawalan hari/bulan dicoba hari-dulu (dd/mm/yyyy ekspor
+    Indonesia) sebelum bulan-dulu; format yang diawali tahun tetap ISO.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = parse_dates(series.cat.categories.to_series(index=None))
+        return pd.Series(
+            categories.to_numpy()[series.cat.codes.to_numpy()], index=series.index
+        ).where(series.cat.codes.to_numpy() >= 0)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    first = series.dropna()
+    first = str(first.iloc[0]) if not first.empty else None
+    if first:
+        with warnings.catch_warnings():
+            # Peringatan "dayfirst=True" untuk nilai yang hanya cocok bulan-dulu (mis. 03/25/2024)
+            warnings.simplefilter('ignore', UserWarning)
+            month_first, day_first = (
+                pd.tseries.api.guess_datetime_format(first, dayfirst=dayfirst) for dayfirst in (False, True)
+            )
+        # Tebakan gagal pada nilai lain (mis. bulan 25) membuat format berikutnya dicoba
+        formats = [day_first, month_first] if month_first and month_first.startswith('%m') else [month_first, day_first]
+        for date_format in dict.fromkeys(f for f in formats if f):
+            parsed = pd.to_datetime(series, format=date_format, errors='coerce')
+            if parsed.notna().sum() == series.notna().sum():
+                return parsed
+    return pd.to_datetime(series, format='mixed')
+
+
+class TimeSeriesCube:
+    """Rollup penjualan per hari x SKU x produk, dihitung sekali saat pemrosesan.
+
+    Periode mingguan dan bulanan dijumlahkan dari sel harian. Jumlah pesanan
+    unik per periode disimpan terpisah (``daily_orders``) karena satu pesanan
+    bisa berisi beberapa SKU, tetapi selalu jatuh di satu hari sehingga bisa
+    dijumlahkan antar hari.
+    """
+
+    def __init__(self, cells, daily_orders):
+        # Kolom: Order Date, Seller SKU, Product Name, Quantity, Orders, Revenue
+        self.cells = cells
+        # Series pesanan unik per hari, index Order Date
+        self.daily_orders = daily_orders
+
+    @classmethod
+    def from_merged(cls, merged_data, date_column):
+        order_dates = parse_dates(merged_data[date_column]).dt.normalize()
+        frame = pd.DataFrame({
+            'Order Date': order_dates,
+            'Seller SKU': merged_data['Seller SKU'],
+            'Product Name': merged_data['Product Name'],
+            'Order ID': merged_data['Order ID'],
+            'Quantity': merged_data['Quantity'],
+            'Revenue': merged_data['Total settlement amount'],
+        }).dropna(subset=['Order Date'])
+
+        cells = frame.groupby(['Order Date'] + CUBE_KEYS, as_index=False, observed=True).agg(
+            Quantity=('Quantity', 'sum'),
+            Orders=('Order ID', 'nunique'),
+            Revenue=('Revenue', 'sum'),
+        )
+        daily_orders = frame.groupby('Order Date', observed=True)['Order ID'].nunique()
+        return cls(cells, daily_orders)
+
+    @classmethod
+    def combine(cls, cubes):
+        """Menggabungkan cube dari partisi dengan pesanan yang saling lepas"""
+        cells = (
+            pd.concat([cube.cells for cube in cubes], ignore_index=True)
+            .groupby(['Order Date'] + CUBE_KEYS, as_index=False, observed=True)
+            .sum()
+        )
+        daily_orders = pd.concat([cube.daily_orders for cube in cubes]).groupby(level=0).sum()
+        return cls(cells, daily_orders)
+
+    @property
+    def empty(self):
+        return self.cells.empty
+
+    @property
+    def date_range(self):
+        return self.daily_orders.index.min(), self.daily_orders.index.max()
+
+    def rollup(self, granularity='day', by=None):
+        """Total per periode, opsional dipecah per ``by`` ('Seller SKU' dan/atau 'Product Name').
+
+        Mengembalikan kolom Period (awal periode), kolom ``by``, Quantity,
+        Orders dan Revenue.
+        """
+        by = [by] if isinstance(by, str) else list(by or [])
+        period = self.cells['Order Date'].dt.to_period(GRANULARITIES[granularity]).dt.start_time
+        rolled = (
+            self.cells.assign(Period=period)
+            .groupby(['Period'] + by, as_index=False, observed=True)[['Quantity', 'Orders', 'Revenue']]
+            .sum()
+        )
+        if not by:
+            # Pesanan dengan beberapa SKU hanya dihitung sekali per periode
+            order_period = self.daily_orders.index.to_period(GRANULARITIES[granularity]).start_time
+            rolled['Orders'] = rolled['Period'].map(self.daily_orders.groupby(order_period).sum())
+        return rolled
@@ -1,8 +1,269 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import json
+from datetime import datetime
+from functools import partial
+# plotly.express diimpor di dalam fungsi grafik agar halaman pertama tidak menunggunya
+from ingestion import UploadCache
+from data_store import ColumnarStore
+from cost_store import open_cost_store
+from data_manager import PROCESS_STAGES
+from figure_cache import FigureCache
+from display_format import show_table
+from chart_sampling import SCATTER_POINT_LIMIT, highlight_points, binned_density
+from instrumentation import instrumentation
+from job_runner import JobRunner
+from partitioned_dataset import PartitionedDataset, dataset_root
+from report_generator import ReportGenerator, EXPORT_FORMATS
+from report_cache import ReportCache, report_key
+
+@st.cache_resource
+def get_upload_cache():
+    """Cache parsing unggahan yang dipakai bersama oleh semua sesi"""
+    return UploadCache(store=ColumnarStore())
+
+@st.cache_resource
+def get_cost_manager():
+    """Penyimpanan biaya sesuai TIKTOKDATA_COST_BACKEND, dipakai bersama oleh semua sesi.
+
+    Bawaannya cache lokal di depan Google Sheets; klien Google Sheets
+    (CostManager) baru dibuat saat sinkronisasi pertama.
+    """
+    return open_cost_store()
+
+def load_session_costs():
+    """Memuat biaya ke sesi tanpa menunggu Google Sheets saat cache lokal masih kosong.
+
+    Selama sinkronisasi pertama berjalan, ``cost_data`` berisi dict kosong dan
+    ``cost_data_loading`` bernilai True sampai show_cost_loading_status memuatnya.
+    ``cost_data_synced`` mencatat sinkronisasi yang sudah termuat, sehingga
+    sync_session_costs tahu kapan sinkronisasi latar membawa data baru.
+    """
+    cost_manager = get_cost_manager()
+    st.session_state.cost_data_synced = cost_manager.last_synced()
+    costs = cost_manager.load_cost_data(wait=False)
+    st.session_state.cost_data_loading = costs is None
+    st.session_state.cost_data = costs if costs is not None else {}
+
+def sync_session_costs():
+    """Memuat biaya sesi pertama kali atau setelah sinkronisasi latar selesai"""
+    if ('cost_data' not in st.session_state
+            or st.session_state.get('cost_data_synced') != get_cost_manager().last_synced()):
+        load_session_costs()
+
+@st.fragment(run_every=1)
+def show_cost_loading_status():
+    """Menunggu sinkronisasi biaya pertama di latar lalu memuat ulang halaman"""
+    cost_manager = get_cost_manager()
+    if cost_manager.last_synced() is not None:
+        load_session_costs()
+        st.rerun()
+    if cost_manager.last_error:
+        st.caption(f"❌ Gagal memuat data biaya: {cost_manager.last_error}")
+        if st.button("🔄 Coba lagi", use_container_width=True):
+            cost_manager.request_revalidation()
+    else:
+        st.caption("⏳ Memuat data biaya...")
+
+@st.fragment(run_every=1)
+def show_cost_refresh_status():
+    """Menunggu validasi ulang dari tombol Segarkan Data lalu memuat ulang halaman"""
+    cost_manager = get_cost_manager()
+    if cost_manager.last_synced() != st.session_state.cost_refresh_from:
+        del st.session_state.cost_refresh_from
+        load_session_costs()
+        st.rerun()
+    if cost_manager.last_error and not cost_manager.status()['syncing']:
+        st.caption(f"❌ Gagal menyegarkan data biaya: {cost_manager.last_error}")
+    else:
+        st.caption("⏳ Menyegarkan data biaya...")
+
+@st.cache_resource
+def get_job_runner():
+    """Thread pool untuk pekerjaan berat, dipakai bersama oleh semua sesi"""
+    return JobRunner()
+
+def _run_processing(data_manager, pesanan_data, income_data, cost_data, progress):
+    merged, summary = data_manager.process_data(pesanan_data, income_data, cost_data, progress=progress)
+    return {
+        'merged_data': merged,
+        'summary_data': summary,
+        'missing_cost_products': data_manager.missing_cost_products,
+        'aggregates': data_manager.aggregates,
+        'unmatched_orders': data_manager.unmatched_orders,
+        'unmatched_settlements': data_manager.unmatched_settlements,
+    }
+
+def _run_dataset_processing(data_manager, dataset, cost_data, progress):
+    merged, summary = data_manager.process_dataset(dataset, cost_data, progress=progress)
+    return {
+        'merged_data': merged,
+        'summary_data': summary,
+        'missing_cost_products': data_manager.missing_cost_products,
+        'aggregates': data_manager.aggregates,
+        'unmatched_orders': data_manager.unmatched_orders,
+        'unmatched_settlements': data_manager.unmatched_settlements,
+    }
+
+@st.cache_resource
+def get_dataset(shop=''):
+    """Dataset multi-periode lokal per toko; sesi dengan nama toko yang sama berbagi dataset"""
+    return PartitionedDataset(dataset_root(shop))
+
+def start_dataset_job():
+    """Memproses seluruh dataset multi-periode di latar"""
+    job = get_job_runner().submit(
+        "process_dataset",
+        _run_dataset_processing,
+        st.session_state.data_manager,
+        get_dataset(st.session_state.get('dataset_shop', '').strip()),
+        dict(st.session_state.cost_data),
+        stages=PROCESS_STAGES
+    )
+    st.session_state.processing_job_id = job.id
+    return job
+
+def start_processing_job():
+    """Menjalankan process_data di latar; hasil lama tetap tampil selama berjalan"""
+    job = get_job_runner().submit(
+        "process_data",
+        _run_processing,
+        st.session_state.data_manager,
+        st.session_state.pesanan_data,
+        st.session_state.income_data,
+        dict(st.session_state.cost_data),
+        stages=PROCESS_STAGES
+    )
+    st.session_state.processing_job_id = job.id
+    return job
+
+def get_processing_job():
+    job_id = st.session_state.get('processing_job_id')
+    return get_job_runner().get(job_id) if job_id else None
+
+@st.fragment(run_every=1)
+def show_processing_status():
+    """Progres job pemrosesan; memperbarui dirinya sendiri sampai job selesai"""
+    job = get_processing_job()
+    if job is None:
+        return
+    
+    if not job.done:
+        st.progress(job.progress, text=f"Memproses data... ({job.stage or 'menunggu'})")
+        if st.button("⛔ Batalkan", use_container_width=True):
+            job.cancel()
+        return
+    
+    st.session_state.processing_job_id = None
+    if job.state == 'done':
+        result = job.result
+        if result['merged_data'] is not None:
+            for key, value in result.items():
+                st.session_state[key] = value
+            st.session_state.processing_message = ("success", "✅ Data diproses!")
+        else:
+            st.session_state.processing_message = ("error", "❌ Tidak ditemukan data yang cocok")
+    elif job.state == 'cancelled':
+        st.session_state.processing_message = ("warning", "⚠️ Pemrosesan dibatalkan")
+    else:
+        st.session_state.processing_message = ("error", f"❌ Kesalahan: {job.error}")
+    st.rerun()
+
+DEBUG_COLUMNS = ['name', 'seconds', 'rows_in', 'rows_out', 'memory_delta_mb', 'source', 'error']
+
+def show_debug_panel():
+    """Panel sidebar berisi span tahap terakhir (waktu, baris, memori)"""
+    with st.expander("🐞 Debug: Metrik Tahap", expanded=False):
+        spans = instrumentation.recent()
+        if not spans:
+            st.caption("Belum ada tahap yang tercatat")
+        else:
+            metrics = pd.DataFrame(spans[::-1])
+            show_table(metrics[[col for col in DEBUG_COLUMNS if col in metrics.columns]])
+        st.caption(f"Metrik lengkap: `{instrumentation.path}`")
+        if spans and st.button("🧹 Bersihkan metrik", use_container_width=True):
+            instrumentation.clear()
+            st.rerun()
+
+@st.cache_resource
+def get_report_cache():
+    """File laporan yang sudah jadi, dipakai bersama oleh semua sesi"""
+    return ReportCache()
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+# Label pilihan format ekspor -> ekstensi pada EXPORT_FORMATS
+EXPORT_LABELS = {
+    "Excel (.xlsx)": 'xlsx',
+    "CSV per lembar (.zip)": 'csv.zip',
+    "Parquet per lembar (.zip)": 'parquet.zip',
+    "Ringkasan JSON (.json)": 'json',
+}
+
+def _build_report(report_cache, cache_key, file_format, merged_data, cost_data, aggregates, progress):
+    progress('report')
+    # Biaya dari saat pemrosesan mungkin sudah diubah; laporan selalu memakai tabel biaya saat ini
+    aggregates = aggregates.for_costs(cost_data)
+    output = ReportGenerator().export(file_format, merged_data, aggregates.summary, cost_data, aggregates=aggregates)
+    return report_cache.put(cache_key, output, extension=file_format)
+
+def get_report_job():
+    job_id = st.session_state.get('report_job_id')
+    return get_job_runner().get(job_id) if job_id else None
+
+@st.fragment(run_every=1)
+def show_report_status():
+    """Progres pembuatan laporan; memuat ulang halaman saat file siap"""
+    job = get_report_job()
+    if job is None:
+        return
+    if not job.done:
+        st.progress(job.progress, text="Membuat laporan...")
+        return
+    st.rerun()
+
+def show_report_export():
+    """Ekspor laporan; laporan yang sama hanya dibuat sekali lalu disajikan dari cache"""
+    export_label = st.selectbox("Format Laporan", list(EXPORT_LABELS), key="export_format")
+    file_format = EXPORT_LABELS[export_label]
+    
+    report_cache = get_report_cache()
+    cache_key = report_key(st.session_state.aggregates, st.session_state.cost_data, extension=file_format)
+    
+    path = report_cache.get(cache_key, extension=file_format)
+    if path:
+        st.download_button(
+            label=f"💾 Unduh {export_label}",
+            data=partial(_read_file, path),
+            file_name=f"income_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_format}",
+            mime=EXPORT_FORMATS[file_format][1],
+            use_container_width=True
+        )
+        return
+    
+    job = get_report_job()
+    if job is not None and not job.done:
+        show_report_status()
+        return
+    if job is not None and job.state == 'failed':
+        st.error(f"Kesalahan: {job.error}")
+    
+    if st.button("📥 Ekspor Laporan", use_container_width=True):
+        job = get_job_runner().submit(
+            "export_report",
+            _build_report,
+            report_cache,
+            cache_key,
+            file_format,
+            st.session_state.merged_data,
+            dict(st.session_state.cost_data),
+            st.session_state.aggregates,
+            stages=['report']
+        )
+        st.session_state.report_job_id = job.id
+        st.rerun()
 
 def show_data_upload_section():
     """Bagian unggah data yang ditingkatkan"""
@@ -22,8 +283,7 @@ def show_data_upload_section():
         
         if pesanan_file:
             try:
-                df = pd.read_excel(pesanan_file, header=0, skiprows=[1])
-                df.columns = df.columns.str.strip()
+                df = get_upload_cache().load(pesanan_file, 'pesanan')
                 st.session_state.pesanan_data = df
                 st.markdown(f'<div class="status-success">✅ Pesanan dimuat: {len(df):,} baris</div>', unsafe_allow_html=True)
                 
@@ -47,8 +307,7 @@ def show_data_upload_section():
         
         if income_file:
             try:
-                df = pd.read_excel(income_file)
-                df.columns = df.columns.str.strip()
+                df = get_upload_cache().load(income_file, 'income')
                 st.session_state.income_data = df
                 st.markdown(f'<div class="status-success">✅ Pendapatan dimuat: {len(df):,} baris</div>', unsafe_allow_html=True)
                 
@@ -59,22 +318,118 @@ def show_data_upload_section():
                 st.markdown(f'<div class="status-error">❌ Kesalahan memuat file: {str(e)}</div>', unsafe_allow_html=True)
         
         st.markdown('</div>', unsafe_allow_html=True)
+    
+    show_dataset_section()
+
+def show_dataset_section():
+    """Menambahkan ekspor ke dataset multi-periode dan memprosesnya"""
+    st.markdown("### 🗂️ Dataset Multi-Periode")
+    shop = st.text_input(
+        "🏪 Nama Toko", key="dataset_shop",
+        help="Setiap toko memiliki dataset sendiri; kosongkan untuk dataset bersama"
+    ).strip()
+    dataset = get_dataset(shop)
+    dataset.refresh()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        ready = st.session_state.pesanan_data is not None or st.session_state.income_data is not None
+        if st.button("➕ Tambahkan Unggahan ke Dataset", disabled=not ready, use_container_width=True):
+            try:
+                touched = set()
+                if st.session_state.pesanan_data is not None:
+                    touched.update(dataset.append_pesanan(st.session_state.pesanan_data))
+                if st.session_state.income_data is not None:
+                    touched.update(dataset.append_income(st.session_state.income_data))
+                if touched:
+                    st.success(f"✅ Bulan diperbarui: {', '.join(sorted(touched))}")
+                else:
+                    st.info("ℹ️ Tidak ada data baru")
+            except Exception as e:
+                st.error(f"❌ Kesalahan menambahkan data: {str(e)}")
+    
+    with col2:
+        processing_job = get_processing_job()
+        if st.button("🔄 Proses Dataset",
+                     disabled=not dataset.months() or (processing_job is not None and not processing_job.done)
+                     or st.session_state.get('cost_data_loading', False),
+                     use_container_width=True):
+            start_dataset_job()
+            st.rerun()
+    
+    if dataset.months():
+        st.caption("Periode: " + ", ".join(f"{m} (v{dataset.month_version(m)})" for m in dataset.months()))
+        with st.expander("🗑️ Kosongkan Dataset"):
+            confirm = st.checkbox(f"Hapus semua data dataset {shop or 'bersama'}", key="dataset_reset_confirm")
+            if st.button("🗑️ Kosongkan", disabled=not confirm, use_container_width=True):
+                dataset.reset()
+                st.rerun()
+
+def show_reconciliation_details():
+    """Pesanan tanpa settlement dan settlement tanpa pesanan"""
+    unmatched_orders = st.session_state.get('unmatched_orders') or []
+    unmatched_settlements = st.session_state.get('unmatched_settlements')
+    if unmatched_orders:
+        with st.expander(f"⚠️ {len(unmatched_orders)} pesanan selesai belum memiliki settlement"):
+            show_table(pd.DataFrame({'Order ID': unmatched_orders}))
+    if unmatched_settlements is not None and not unmatched_settlements.empty:
+        with st.expander(f"⚠️ {len(unmatched_settlements)} settlement tanpa pesanan selesai"):
+            show_table(unmatched_settlements.reset_index())
+
+TREND_GRANULARITIES = {'day': 'Harian', 'week': 'Mingguan', 'month': 'Bulanan'}
+TREND_METRICS = {'Revenue': 'Pendapatan', 'Quantity': 'Kuantitas', 'Orders': 'Pesanan'}
+
+def show_trend_charts(aggregates):
+    """Grafik tren dari rollup deret waktu, bukan dari baris mentah"""
+    import plotly.express as px
+    time_series = aggregates.time_series
+    if time_series is None:
+        return
+    
+    st.markdown("---")
+    st.markdown("### 📈 Tren Penjualan")
+    
+    option_col1, option_col2 = st.columns(2)
+    with option_col1:
+        granularity = st.radio("Periode", list(TREND_GRANULARITIES), format_func=TREND_GRANULARITIES.get,
+                               horizontal=True, key="trend_granularity")
+    with option_col2:
+        metric = st.radio("Metrik", list(TREND_METRICS), format_func=TREND_METRICS.get,
+                          horizontal=True, key="trend_metric")
+    
+    trend_col1, trend_col2 = st.columns(2)
+    
+    with trend_col1:
+        totals = time_series.rollup(granularity)
+        fig = px.line(totals, x='Period', y=metric, markers=True,
+                      title=f"{TREND_METRICS[metric]} {TREND_GRANULARITIES[granularity]}")
+        fig.update_layout(height=400, xaxis_title=None, yaxis_title=TREND_METRICS[metric])
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with trend_col2:
+        by_sku = time_series.rollup(granularity, by='Seller SKU')
+        top_skus = by_sku.groupby('Seller SKU', observed=True)[metric].sum().nlargest(5).index
+        fig = px.line(by_sku[by_sku['Seller SKU'].isin(top_skus)], x='Period', y=metric, color='Seller SKU',
+                      markers=True, title=f"{TREND_METRICS[metric]} 5 SKU Teratas")
+        fig.update_layout(height=400, xaxis_title=None, yaxis_title=TREND_METRICS[metric])
+        st.plotly_chart(fig, use_container_width=True)
 
 def show_metrics_dashboard():
     """Dasbor metrik yang ditingkatkan"""
     if st.session_state.summary_data is not None:
+        import plotly.express as px
         st.markdown("### 📊 Dasbor Kinerja")
         
-        # Hitung metrik kunci
-        unique_orders = st.session_state.merged_data.drop_duplicates(subset=['Order ID'])
-        total_orders = unique_orders['Order ID'].nunique()
-        total_revenue = unique_orders['Total settlement amount'].sum()
-        total_cost = st.session_state.summary_data['Total Cost'].sum()
-        total_profit = total_revenue - total_cost
+        # Metrik kunci dari agregat bersama
+        aggregates = st.session_state.aggregates
+        total_orders = aggregates.total_orders
+        total_revenue = aggregates.total_revenue
+        total_cost = aggregates.total_cost
+        total_profit = aggregates.total_profit
         total_share_60 = total_profit * 0.6
         total_share_40 = total_profit * 0.4
-        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-        profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
+        avg_order_value = aggregates.avg_order_value
+        profit_margin = aggregates.profit_margin
         
         # Metrik utama dengan 6 kolom
         col1, col2, col3 = st.columns(3)
@@ -120,6 +475,9 @@ def show_metrics_dashboard():
                 value=f"Rp {total_share_40:,.0f}"
             )
         
+        show_reconciliation_details()
+        show_trend_charts(aggregates)
+        
         # AI Summary
         st.markdown("---")
         if st.button("📄 Tampilkan Ringkasan (Copy ke ChatGPT)", type="secondary"):
@@ -194,24 +552,24 @@ def show_metrics_dashboard():
             st.markdown("**🏆 Performa Teratas**")
             
             top_profit = st.session_state.summary_data.nlargest(5, 'Profit')[['Product Name', 'Profit', 'Profit Margin %']]
-            top_profit['Profit'] = top_profit['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-            top_profit['Profit Margin %'] = top_profit['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
             
-            st.dataframe(top_profit, use_container_width=True, hide_index=True)
+            show_table(top_profit)
         
         with analysis_col2:
             st.markdown("**⚠️ Produk Margin Rendah**")
             
             low_margin = st.session_state.summary_data.nsmallest(5, 'Profit Margin %')[['Product Name', 'Profit', 'Profit Margin %']]
-            low_margin['Profit'] = low_margin['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-            low_margin['Profit Margin %'] = low_margin['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
             
-            st.dataframe(low_margin, use_container_width=True, hide_index=True)
+            show_table(low_margin)
 
 def show_cost_management():
     """Antarmuka manajemen biaya yang ditingkatkan"""
     st.markdown("### 💸 Manajemen Biaya")
     
+    if st.session_state.get('cost_data_loading'):
+        st.info("⏳ Data biaya sedang dimuat dari Google Sheets...")
+        return
+    
     # Bilah aksi cepat
     action_col1, action_col2, action_col3 = st.columns(3)
     
@@ -230,9 +588,20 @@ def show_cost_management():
     
     with action_col3:
         if st.button("🔄 Segarkan Data", help="Muat ulang data biaya dari file"):
-            st.session_state.cost_data = CostManager().load_cost_data()
+            cost_manager = get_cost_manager()
+            last_synced = cost_manager.last_synced()
+            if last_synced is None:
+                # Penyimpanan lokal tidak disinkronkan: cukup dibaca ulang
+                load_session_costs()
+            else:
+                # Sinkronisasi berjalan di latar; show_cost_refresh_status memuat hasilnya
+                st.session_state.cost_refresh_from = last_synced
+                cost_manager.request_revalidation()
             st.rerun()
     
+    if 'cost_refresh_from' in st.session_state:
+        show_cost_refresh_status()
+    
     st.markdown("---")
     
     # Form manajemen biaya
@@ -274,8 +643,9 @@ def show_cost_management():
         with btn_col1:
             if st.button("💾 Simpan Biaya", type="primary"):
                 if selected_product and cost_input >= 0:
-                    st.session_state.cost_data[selected_product] = cost_input
-                    CostManager().save_cost_data(st.session_state.cost_data)
+                    # Hanya produk ini yang ditulis agar biaya hasil sinkronisasi lain tidak terhapus
+                    get_cost_manager().set_cost(selected_product, cost_input)
+                    load_session_costs()
                     st.success(f"✅ Biaya disimpan untuk {selected_product}")
                     st.rerun()
                 else:
@@ -284,8 +654,8 @@ def show_cost_management():
         with btn_col2:
             if st.button("🗑️ Hapus Biaya", type="secondary"):
                 if selected_product in st.session_state.cost_data:
-                    del st.session_state.cost_data[selected_product]
-                    CostManager().save_cost_data(st.session_state.cost_data)
+                    get_cost_manager().delete_cost(selected_product)
+                    load_session_costs()
                     st.success(f"✅ Biaya dihapus untuk {selected_product}")
                     st.rerun()
                 else:
@@ -310,6 +680,11 @@ def show_cost_management():
             st.metric("📈 Biaya Maksimum", f"Rp {max_cost:,.0f}")
         else:
             st.info("Tidak ada data biaya")
+        
+        missing_products = st.session_state.get('missing_cost_products') or []
+        if missing_products:
+            with st.expander(f"⚠️ {len(missing_products)} produk belum memiliki biaya"):
+                st.write("\n".join(f"- {name}" for name in missing_products))
     
     # Tabel data biaya
     st.markdown("---")
@@ -329,14 +704,244 @@ def show_cost_management():
         
         cost_df = cost_df.sort_values("Product Name")
         
-        # Format untuk tampilan
-        cost_display = cost_df.copy()
-        cost_display['Cost per Unit'] = cost_display['Cost per Unit'].apply(lambda x: f"Rp {x:,.0f}")
-        
-        st.dataframe(cost_display, use_container_width=True, hide_index=True)
+        show_table(cost_df)
     else:
         st.info("ℹ️ Tidak ada data biaya. Tambahkan beberapa biaya produk untuk memulai.")
 
+@st.cache_resource
+def get_figure_cache():
+    """Figur grafik analisis lanjutan, dipakai bersama oleh semua sesi"""
+    return FigureCache()
+
+def _density_scatter_figure(summary_data, x, y, labels, title, limit):
+    """Scatter untuk katalog besar: kepadatan ter-bin di sisi server, ditambah
+    produk teratas (berlabel) dan pencilan sebagai titik WebGL"""
+    import plotly.graph_objects as go
+    top_mask, outlier_mask = highlight_points(summary_data, x, y, 'Revenue', limit=limit)
+    rest = summary_data[~(top_mask | outlier_mask)]
+    x_centers, y_centers, counts = binned_density(rest, x, y)
+    
+    fig = go.Figure()
+    fig.add_trace(go.Heatmap(
+        x=x_centers, y=y_centers, z=counts,
+        colorscale='Blues', colorbar=dict(title='Jumlah Produk', x=1.15),
+        hovertemplate=f"{labels[x]}: %{{x:,.0f}}<br>{labels[y]}: %{{y:,.1f}}<br>Produk: %{{z}}<extra></extra>",
+        name="Kepadatan"
+    ))
+    
+    hover_template = (
+        "%{hovertext}<br>" + f"{labels[x]}: %{{x:,.0f}}<br>{labels[y]}: %{{y:,.1f}}" +
+        "<br>Margin: %{marker.color:.1f}%<extra></extra>"
+    )
+    outliers = summary_data[outlier_mask]
+    fig.add_trace(go.Scattergl(
+        x=outliers[x], y=outliers[y], mode='markers', name="Pencilan",
+        hovertext=outliers['Product Name'], hovertemplate=hover_template,
+        marker=dict(color=outliers['Profit Margin %'], colorscale='RdYlGn', size=7,
+                    line=dict(width=0.5, color='black'))
+    ))
+    
+    top = summary_data[top_mask]
+    fig.add_trace(go.Scatter(
+        x=top[x], y=top[y], mode='markers+text', name=f"{len(top)} Produk Teratas",
+        text=top['Product Name'].astype(str).str.slice(0, 20), textposition='top center',
+        hovertext=top['Product Name'], hovertemplate=hover_template,
+        marker=dict(color=top['Profit Margin %'], colorscale='RdYlGn', size=11,
+                    colorbar=dict(title='Margin %'), line=dict(width=1, color='black'))
+    ))
+    
+    fig.update_layout(
+        title=f"{title} ({len(summary_data):,} produk, mode kepadatan)",
+        xaxis_title=labels[x], yaxis_title=labels[y],
+        legend=dict(orientation='h', y=-0.15), height=500
+    )
+    return fig
+
+def _revenue_profit_figure(summary_data, limit=SCATTER_POINT_LIMIT):
+    import plotly.express as px
+    if len(summary_data) > limit:
+        return _density_scatter_figure(
+            summary_data, 'Revenue', 'Profit',
+            {'Revenue': 'Pendapatan (Rp)', 'Profit': 'Profit (Rp)'},
+            "Analisis Pendapatan vs Profit", limit
+        )
+    
+    fig = px.scatter(
+        summary_data,
+        x='Revenue',
+        y='Profit',
+        size='TotalQty',
+        color='Profit Margin %',
+        hover_data=['Product Name'],
+        title="Analisis Pendapatan vs Profit",
+        color_continuous_scale='RdYlGn',
+        labels={'Revenue': 'Pendapatan (Rp)', 'Profit': 'Profit (Rp)'}
+    )
+    
+    fig.update_layout(height=500)
+    return fig
+
+def _margin_analysis_figure(summary_data):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    # Buat subplot
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Distribusi Margin Profit', 'Produk Teratas berdasarkan Margin', 
+                      'Pendapatan vs Margin', 'Kuantitas vs Margin'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    
+    # Histogram
+    fig.add_trace(
+        go.Histogram(x=summary_data['Profit Margin %'], 
+                   name="Distribusi Margin", showlegend=False),
+        row=1, col=1
+    )
+    
+    # Produk teratas berdasarkan margin
+    top_margin = summary_data.nlargest(10, 'Profit Margin %')
+    fig.add_trace(
+        go.Bar(x=top_margin['Product Name'], y=top_margin['Profit Margin %'],
+              name="Margin Tertinggi", showlegend=False),
+        row=1, col=2
+    )
+    
+    # Scatter pendapatan vs margin
+    fig.add_trace(
+        go.Scatter(x=summary_data['Revenue'], 
+                  y=summary_data['Profit Margin %'],
+                  mode='markers', name="Pendapatan vs Margin", showlegend=False),
+        row=2, col=1
+    )
+    
+    # Scatter kuantitas vs margin
+    fig.add_trace(
+        go.Scatter(x=summary_data['TotalQty'], 
+                  y=summary_data['Profit Margin %'],
+                  mode='markers', name="Kuantitas vs Margin", showlegend=False),
+        row=2, col=2
+    )
+    
+    fig.update_layout(height=600, title_text="Analisis Komprehensif Margin Profit")
+    return fig
+
+def _performance_matrix_figure(summary_data, limit=SCATTER_POINT_LIMIT):
+    if len(summary_data) > limit:
+        fig = _density_scatter_figure(
+            summary_data, 'TotalQty', 'Profit Margin %',
+            {'TotalQty': 'Total Kuantitas Terjual', 'Profit Margin %': 'Margin Profit (%)'},
+            "Matriks Kinerja Produk", limit
+        )
+    else:
+        fig = _performance_matrix_scatter(summary_data)
+    
+    # Tambahkan garis kuadran
+    median_qty = summary_data['TotalQty'].median()
+    median_margin = summary_data['Profit Margin %'].median()
+    
+    fig.add_hline(y=median_margin, line_dash="dash", line_color="red", 
+                 annotation_text=f"Margin Median: {median_margin:.1f}%")
+    fig.add_vline(x=median_qty, line_dash="dash", line_color="red", 
+                 annotation_text=f"Kuantitas Median: {median_qty:.0f}")
+    
+    fig.update_layout(height=500)
+    return fig
+
+def _performance_matrix_scatter(summary_data):
+    import plotly.express as px
+    # Buat matriks kinerja dengan perbaikan untuk nilai negatif
+    plot_data = summary_data.copy()
+    
+    # Pastikan nilai size selalu positif (gunakan absolut + offset kecil)
+    plot_data['size_value'] = plot_data['Revenue'].abs() + 1
+    
+    fig = px.scatter(
+        plot_data,
+        x='TotalQty',
+        y='Profit Margin %',
+        size='size_value',  # Gunakan nilai yang sudah diperbaiki
+        color='Profit',
+        hover_name='Product Name',
+        hover_data={
+            'Revenue': ':,.0f',
+            'Profit': ':,.0f',
+            'TotalQty': ':,.0f',
+            'Profit Margin %': ':.1f',
+            'size_value': False  # Sembunyikan kolom size_value dari hover
+        },
+        title="Matriks Kinerja Produk",
+        labels={
+            'TotalQty': 'Total Kuantitas Terjual', 
+            'Profit Margin %': 'Margin Profit (%)',
+            'Profit': 'Profit (Rp)'
+        },
+        color_continuous_scale='RdYlGn',
+        size_max=50  # Batasi ukuran maksimum marker
+    )
+    return fig
+
+def _sales_distribution_figure(summary_data):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    # Buat analisis distribusi
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Distribusi Pendapatan', 'Distribusi Profit', 
+                      'Distribusi Kuantitas', 'Pendapatan Kumulatif'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    
+    # Distribusi pendapatan
+    fig.add_trace(
+        go.Box(y=summary_data['Revenue'], 
+              name="Pendapatan", showlegend=False),
+        row=1, col=1
+    )
+    
+    # Distribusi profit
+    fig.add_trace(
+        go.Box(y=summary_data['Profit'], 
+              name="Profit", showlegend=False),
+        row=1, col=2
+    )
+    
+    # Distribusi kuantitas
+    fig.add_trace(
+        go.Box(y=summary_data['TotalQty'], 
+              name="Kuantitas", showlegend=False),
+        row=2, col=1
+    )
+    
+    # Pendapatan kumulatif (Pareto)
+    sorted_data = summary_data.sort_values('Revenue', ascending=False)
+    sorted_data['Cumulative Revenue'] = sorted_data['Revenue'].cumsum()
+    sorted_data['Cumulative %'] = (sorted_data['Cumulative Revenue'] / sorted_data['Revenue'].sum()) * 100
+    
+    fig.add_trace(
+        go.Scatter(x=list(range(1, len(sorted_data) + 1)), 
+                  y=sorted_data['Cumulative %'],
+                  mode='lines+markers', name="Persentase Pendapatan Kumulatif", showlegend=False),
+        row=2, col=2
+    )
+    
+    fig.update_layout(height=600, title_text="Analisis Distribusi Penjualan")
+    return fig
+
+# Jenis grafik analisis lanjutan -> fungsi pembangun figur dari summary_data
+CHART_BUILDERS = {
+    "Pendapatan vs Profit (Scatter)": _revenue_profit_figure,
+    "Analisis Margin Profit": _margin_analysis_figure,
+    "Matriks Kinerja Produk": _performance_matrix_figure,
+    "Distribusi Penjualan": _sales_distribution_figure,
+}
+# Kolom tabel produk per kuadran pada Matriks Kinerja Produk
+QUADRANT_COLUMNS = ['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']
+# Grafik scatter yang beralih ke mode kepadatan di atas SCATTER_POINT_LIMIT
+DOWNSAMPLED_CHARTS = {"Pendapatan vs Profit (Scatter)", "Matriks Kinerja Produk"}
+
 def show_advanced_analytics():
     """Analisis lanjutan dengan grafik interaktif"""
     if st.session_state.summary_data is not None:
@@ -345,120 +950,29 @@ def show_advanced_analytics():
         # Pemilihan grafik
         chart_type = st.selectbox(
             "📈 Pilih Jenis Grafik",
-            ["Pendapatan vs Profit (Scatter)", "Analisis Margin Profit", "Matriks Kinerja Produk", "Distribusi Penjualan"]
+            list(CHART_BUILDERS)
         )
         
-        if chart_type == "Pendapatan vs Profit (Scatter)":
-            fig = px.scatter(
-                st.session_state.summary_data,
-                x='Revenue',
-                y='Profit',
-                size='TotalQty',
-                color='Profit Margin %',
-                hover_data=['Product Name'],
-                title="Analisis Pendapatan vs Profit",
-                color_continuous_scale='RdYlGn',
-                labels={'Revenue': 'Pendapatan (Rp)', 'Profit': 'Profit (Rp)'}
-            )
-            
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
-        
-        elif chart_type == "Analisis Margin Profit":
-            # Buat subplot
-            fig = make_subplots(
-                rows=2, cols=2,
-                subplot_titles=('Distribusi Margin Profit', 'Produk Teratas berdasarkan Margin', 
-                              'Pendapatan vs Margin', 'Kuantitas vs Margin'),
-                specs=[[{"secondary_y": False}, {"secondary_y": False}],
-                       [{"secondary_y": False}, {"secondary_y": False}]]
-            )
-            
-            # Histogram
-            fig.add_trace(
-                go.Histogram(x=st.session_state.summary_data['Profit Margin %'], 
-                           name="Distribusi Margin", showlegend=False),
-                row=1, col=1
-            )
-            
-            # Produk teratas berdasarkan margin
-            top_margin = st.session_state.summary_data.nlargest(10, 'Profit Margin %')
-            fig.add_trace(
-                go.Bar(x=top_margin['Product Name'], y=top_margin['Profit Margin %'],
-                      name="Margin Tertinggi", showlegend=False),
-                row=1, col=2
-            )
-            
-            # Scatter pendapatan vs margin
-            fig.add_trace(
-                go.Scatter(x=st.session_state.summary_data['Revenue'], 
-                          y=st.session_state.summary_data['Profit Margin %'],
-                          mode='markers', name="Pendapatan vs Margin", showlegend=False),
-                row=2, col=1
-            )
-            
-            # Scatter kuantitas vs margin
-            fig.add_trace(
-                go.Scatter(x=st.session_state.summary_data['TotalQty'], 
-                          y=st.session_state.summary_data['Profit Margin %'],
-                          mode='markers', name="Kuantitas vs Margin", showlegend=False),
-                row=2, col=2
+        # Figur dibangun sekali per dataset dan jenis grafik
+        summary_data = st.session_state.summary_data
+        if chart_type in DOWNSAMPLED_CHARTS and len(summary_data) > SCATTER_POINT_LIMIT:
+            limit = st.number_input(
+                "🔢 Batas titik scatter", min_value=1, value=SCATTER_POINT_LIMIT, step=500,
+                help="Di atas batas ini hanya produk teratas dan pencilan yang ditampilkan sebagai titik; sisanya sebagai peta kepadatan"
             )
-            
-            fig.update_layout(height=600, title_text="Analisis Komprehensif Margin Profit")
-            st.plotly_chart(fig, use_container_width=True)
+            builder = partial(CHART_BUILDERS[chart_type], summary_data, limit=limit)
+            cache_key = (st.session_state.aggregates.fingerprint, chart_type, limit)
+        else:
+            builder = partial(CHART_BUILDERS[chart_type], summary_data)
+            cache_key = (st.session_state.aggregates.fingerprint, chart_type)
+        fig = get_figure_cache().get_or_build(cache_key, builder)
+        st.plotly_chart(fig, use_container_width=True)
         
-        elif chart_type == "Matriks Kinerja Produk":
-            # Buat matriks kinerja dengan perbaikan untuk nilai negatif
-            plot_data = st.session_state.summary_data.copy()
-            
-            # Pastikan nilai size selalu positif (gunakan absolut + offset kecil)
-            plot_data['size_value'] = plot_data['Revenue'].abs() + 1
-            
-            # Buat informasi hover yang lebih informatif
-            plot_data['hover_text'] = (
-                plot_data['Product Name'] + '<br>' +
-                'Revenue: Rp ' + plot_data['Revenue'].apply(lambda x: f"{x:,.0f}") + '<br>' +
-                'Profit: Rp ' + plot_data['Profit'].apply(lambda x: f"{x:,.0f}") + '<br>' +
-                'Margin: ' + plot_data['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-            )
-            
-            fig = px.scatter(
-                plot_data,
-                x='TotalQty',
-                y='Profit Margin %',
-                size='size_value',  # Gunakan nilai yang sudah diperbaiki
-                color='Profit',
-                hover_name='Product Name',
-                hover_data={
-                    'Revenue': ':,.0f',
-                    'Profit': ':,.0f',
-                    'TotalQty': ':,.0f',
-                    'Profit Margin %': ':.1f',
-                    'size_value': False  # Sembunyikan kolom size_value dari hover
-                },
-                title="Matriks Kinerja Produk",
-                labels={
-                    'TotalQty': 'Total Kuantitas Terjual', 
-                    'Profit Margin %': 'Margin Profit (%)',
-                    'Profit': 'Profit (Rp)'
-                },
-                color_continuous_scale='RdYlGn',
-                size_max=50  # Batasi ukuran maksimum marker
-            )
-            
-            # Tambahkan garis kuadran
+        if chart_type == "Matriks Kinerja Produk":
+            plot_data = summary_data
             median_qty = plot_data['TotalQty'].median()
             median_margin = plot_data['Profit Margin %'].median()
             
-            fig.add_hline(y=median_margin, line_dash="dash", line_color="red", 
-                         annotation_text=f"Margin Median: {median_margin:.1f}%")
-            fig.add_vline(x=median_qty, line_dash="dash", line_color="red", 
-                         annotation_text=f"Kuantitas Median: {median_qty:.0f}")
-            
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
-            
             # Analisis kuadran
             st.markdown("**📊 Analisis Kuadran:**")
             quad_col1, quad_col2, quad_col3, quad_col4 = st.columns(4)
@@ -512,90 +1026,28 @@ def show_advanced_analytics():
             
             with quad_tab1:
                 if len(stars) > 0:
-                    display_stars = stars[['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']].copy()
-                    display_stars['Revenue'] = display_stars['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_stars['Profit'] = display_stars['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_stars['Profit Margin %'] = display_stars['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-                    st.dataframe(display_stars.sort_values('TotalQty', ascending=False), use_container_width=True, hide_index=True)
+                    show_table(stars[QUADRANT_COLUMNS].sort_values('TotalQty', ascending=False))
                 else:
                     st.info("Tidak ada produk dalam kategori ini")
             
             with quad_tab2:
                 if len(workhorses) > 0:
-                    display_workhorses = workhorses[['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']].copy()
-                    display_workhorses['Revenue'] = display_workhorses['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_workhorses['Profit'] = display_workhorses['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_workhorses['Profit Margin %'] = display_workhorses['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-                    st.dataframe(display_workhorses.sort_values('TotalQty', ascending=False), use_container_width=True, hide_index=True)
+                    show_table(workhorses[QUADRANT_COLUMNS].sort_values('TotalQty', ascending=False))
                 else:
                     st.info("Tidak ada produk dalam kategori ini")
             
             with quad_tab3:
                 if len(niche) > 0:
-                    display_niche = niche[['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']].copy()
-                    display_niche['Revenue'] = display_niche['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_niche['Profit'] = display_niche['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_niche['Profit Margin %'] = display_niche['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-                    st.dataframe(display_niche.sort_values('Profit Margin %', ascending=False), use_container_width=True, hide_index=True)
+                    show_table(niche[QUADRANT_COLUMNS].sort_values('Profit Margin %', ascending=False))
                 else:
                     st.info("Tidak ada produk dalam kategori ini")
             
             with quad_tab4:
                 if len(problem) > 0:
-                    display_problem = problem[['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']].copy()
-                    display_problem['Revenue'] = display_problem['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_problem['Profit'] = display_problem['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_problem['Profit Margin %'] = display_problem['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-                    st.dataframe(display_problem.sort_values('Profit Margin %', ascending=False), use_container_width=True, hide_index=True)
+                    show_table(problem[QUADRANT_COLUMNS].sort_values('Profit Margin %', ascending=False))
                 else:
                     st.info("Tidak ada produk dalam kategori ini")
         
-        elif chart_type == "Distribusi Penjualan":
-            # Buat analisis distribusi
-            fig = make_subplots(
-                rows=2, cols=2,
-                subplot_titles=('Distribusi Pendapatan', 'Distribusi Profit', 
-                              'Distribusi Kuantitas', 'Pendapatan Kumulatif'),
-                specs=[[{"secondary_y": False}, {"secondary_y": False}],
-                       [{"secondary_y": False}, {"secondary_y": False}]]
-            )
-            
-            # Distribusi pendapatan
-            fig.add_trace(
-                go.Box(y=st.session_state.summary_data['Revenue'], 
-                      name="Pendapatan", showlegend=False),
-                row=1, col=1
-            )
-            
-            # Distribusi profit
-            fig.add_trace(
-                go.Box(y=st.session_state.summary_data['Profit'], 
-                      name="Profit", showlegend=False),
-                row=1, col=2
-            )
-            
-            # Distribusi kuantitas
-            fig.add_trace(
-                go.Box(y=st.session_state.summary_data['TotalQty'], 
-                      name="Kuantitas", showlegend=False),
-                row=2, col=1
-            )
-            
-            # Pendapatan kumulatif (Pareto)
-            sorted_data = st.session_state.summary_data.sort_values('Revenue', ascending=False)
-            sorted_data['Cumulative Revenue'] = sorted_data['Revenue'].cumsum()
-            sorted_data['Cumulative %'] = (sorted_data['Cumulative Revenue'] / sorted_data['Revenue'].sum()) * 100
-            
-            fig.add_trace(
-                go.Scatter(x=list(range(1, len(sorted_data) + 1)), 
-                          y=sorted_data['Cumulative %'],
-                          mode='lines+markers', name="Persentase Pendapatan Kumulatif", showlegend=False),
-                row=2, col=2
-            )
-            
-            fig.update_layout(height=600, title_text="Analisis Distribusi Penjualan")
-            st.plotly_chart(fig, use_container_width=True)
-        
         # Wawasan tambahan
 
                 # --- 🔗 Tombol Ringkas + Lanjut ke ChatGPT ---
@@ -687,13 +1139,12 @@ def show_advanced_analytics():
 
 def generate_ai_summary(summary_df):
     # --- Hitung metrik BERSIH (tanpa duplikat order) ---
-    if st.session_state.merged_data is None:
+    if st.session_state.aggregates is None:
         return "Data belum diproses."
 
-    unique_orders = st.session_state.merged_data.drop_duplicates(subset=['Order ID'])
-    total_r = unique_orders['Total settlement amount'].sum()
-    total_cost = summary_df['Total Cost'].sum()
-    total_p = total_r - total_cost
+    aggregates = st.session_state.aggregates
+    total_r = aggregates.total_revenue
+    total_p = aggregates.total_profit
     avg_m   = summary_df['Profit Margin %'].mean()
 
     top = summary_df.nlargest(5, 'Profit')[['Product Name', 'Profit', 'Profit Margin %']]